@@ -1,9 +1,28 @@
 """API routes for SIVA application."""
 
+import asyncio
 import datetime
-from typing import Dict, Any
+import logging
+import threading
+import time
+import weakref
+import orjson
+from collections import Counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from core.schemas import (
     UserMessage,
@@ -18,88 +37,242 @@ from core.processor import UnifiedProcessor
 from core.data_manager import DataManager
 from core.vector_store import VectorStore
 from core.llm_judge import LLMJudge
+from core.session_store import SessionStore
 from config.settings import settings
 
+logger = logging.getLogger("siva.routes")
+
 # Global components (will be initialized in main.py)
 vector_store: VectorStore = None
 llm_judge: LLMJudge = None
 data_manager: DataManager = None
 openai_client = None
-sessions: Dict[str, Dict[str, Any]] = {}
+sessions: SessionStore = SessionStore(
+    maxsize=settings.session_max_count, ttl=settings.session_ttl_seconds
+)
 current_mode: str = "patient_intake"
+
+# Running totals of completed calls and evaluations in this process, updated at
+# write time so the dashboard endpoints don't scan every live session on each
+# poll. Counters rather than per-session records, so they stay bounded as the
+# session store evicts sessions.
+_tally: Counter = Counter()  # "completed", "evaluations", "correct"
+_route_errors: Counter = Counter()  # misroutes by LLMJudge.route_error_key
+# Evaluations from the last /dashboard/demo run by (fixed) demo session id; a
+# rerun replaces their contribution to the totals instead of adding to it
+_demo_evaluations: Dict[str, Dict[str, Any]] = {}
 siva_bridge = None  # Bridge for tau2-bench integration
 
-# Create router
+# Completed calls are archived in a worker thread after the final reply; the set
+# keeps the tasks referenced until they finish
+_archive_tasks: Set[asyncio.Task] = set()
+# Worker threads writing to the vector store or the data files take turns here
+_storage_lock = threading.Lock()
+
+# Turns behind /chat/stream responses, referenced until they finish
+_stream_turns: Set[asyncio.Task] = set()
+
+# One lock per session so overlapping turns (a retried POST racing the voice
+# socket) don't interleave on the same history. Entries vanish once no turn holds
+# or waits on the lock, so the map stays as small as the live turns.
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+# Create router. Endpoints returning dicts are annotated so FastAPI serializes
+# them with Pydantic's compiled JSON encoder rather than jsonable_encoder
 router = APIRouter()
 
 
 @router.post("/chat")
 async def chat(user_message: UserMessage):
     """Handle chat messages from users."""
+    response = await process_chat_turn(user_message.session_id, user_message.message)
+    # The payload echoes the whole history, so serialize it with orjson
+    return Response(content=orjson.dumps(response), media_type="application/json")
+
+
+def _sse_event(event: str, data: Any) -> bytes:
+    """Encode one server-sent event with a JSON data line."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(user_message: UserMessage):
+    """Handle a chat message, streaming the reply as server-sent events.
+
+    Each reply text delta is sent as a "delta" event while the model generates it,
+    and the /chat response payload follows as the final "done" event.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def on_text_delta(delta: str):
+        await events.put(_sse_event("delta", delta))
+
+    async def run_turn():
+        # The turn finishes even if the client goes away, as with /chat
+        try:
+            response = await process_chat_turn(
+                user_message.session_id, user_message.message, on_text_delta
+            )
+            await events.put(_sse_event("done", response))
+        except Exception as e:
+            logger.exception("Streamed chat turn failed")
+            await events.put(_sse_event("error", {"detail": str(e)}))
+        await events.put(None)
+
+    turn = asyncio.create_task(run_turn())
+    _stream_turns.add(turn)
+    turn.add_done_callback(_stream_turns.discard)
+
+    async def stream() -> AsyncIterator[bytes]:
+        while (event := await events.get()) is not None:
+            yield event
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+def _get_processor(session: Dict[str, Any]) -> UnifiedProcessor:
+    """Return the processor cached on the session, creating it on first use.
+
+    It is kept under session["_processor"]; underscore keys hold runtime objects
+    and are left out of the export.
+    """
+    processor = session.get("_processor")
+    if processor is None:
+        processor = UnifiedProcessor(
+            session,
+            vector_store,
+            llm_judge,
+            openai_client,
+            settings.retrieval_threshold,
+            current_mode,
+        )
+        session["_processor"] = processor
+    return processor
+
+
+def _archive_conversation(session_id: str, conversation_data: Dict[str, Any]):
+    """Save a completed conversation and add it to the vector store for learning."""
+    # The symptom summary and the embedding are network calls, so they run before
+    # taking the storage lock; only the writes themselves are serialized
+    entries = []
+    try:
+        conversation = conversation_data["messages"]
+        data = conversation_data["data"]
+
+        # Only add if we have routing information
+        if "routing" in data and data["routing"]:
+            routing = data["routing"]
+            if isinstance(routing, dict) and "route" in routing:
+                # Create symptoms summary
+                symptoms_summary = llm_judge.extract_symptoms_summary(conversation)
+                entries = vector_store.embed_labeled_cases(
+                    [
+                        {
+                            "conversation_messages": conversation,
+                            "correct_route": routing["route"],
+                            "symptoms_summary": symptoms_summary,
+                            "session_id": session_id,
+                        }
+                    ]
+                )
+            else:
+                logger.warning("No valid routing found in data: %s", routing)
+        else:
+            logger.debug("No routing data available for vector store addition")
+    except Exception:
+        logger.exception("Error preparing conversation for the vector store")
+
+    with _storage_lock:
+        data_manager.save_conversation(session_id, conversation_data)
+
+        # Automatically add completed conversations to vector store for learning
+        if entries:
+            try:
+                vector_store.add_embedded_cases(entries)
+                logger.info(
+                    "Added completed conversation to vector store: %s",
+                    entries[0]["correct_route"],
+                )
+            except Exception:
+                logger.exception("Error adding conversation to vector store")
+
+
+async def drain_archive_tasks():
+    """Wait for completed calls still being archived (called on app shutdown)."""
+    if _archive_tasks:
+        await asyncio.gather(*_archive_tasks, return_exceptions=True)
+
+
+async def process_chat_turn(
+    session_id: str,
+    message: str,
+    on_text_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """Run one conversation turn and build the /chat response payload.
+
+    Shared by the /chat endpoint and the /ws/chat voice socket, which passes
+    on_text_delta to receive the reply text while it is being generated. Turns of
+    the same session run one at a time.
+    """
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    async with lock:
+        return await _run_chat_turn(session_id, message, on_text_delta)
+
+
+async def _run_chat_turn(
+    session_id: str,
+    message: str,
+    on_text_delta: Optional[Callable[[str], Awaitable[None]]],
+) -> Dict[str, Any]:
     # Get or create session
-    session = sessions.setdefault(user_message.session_id, {})
-    session["session_id"] = user_message.session_id  # Ensure session_id is stored
+    session = sessions.setdefault(session_id, {})
+    session["session_id"] = session_id  # Ensure session_id is stored
 
-    # Add timestamp for tracking
+    # Add timestamp for tracking; last_activity is a plain epoch float
     if "created_at" not in session:
         session["created_at"] = datetime.datetime.now().isoformat()
-    session["last_activity"] = datetime.datetime.now().isoformat()
-
-    processor = UnifiedProcessor(
-        session,
-        vector_store,
-        llm_judge,
-        openai_client,
-        settings.retrieval_threshold,
-        current_mode,
-    )
+    session["last_activity"] = time.time()
+
+    processor = _get_processor(session)
 
     # Get response with potential escalation info
-    reply, end_call, escalation_info = processor.next_prompt(user_message.message)
+    reply, end_call, escalation_info = await processor.next_prompt(
+        message, on_text_delta
+    )
 
     # Mark session as completed
     if end_call:
+        if not session.get("completed"):
+            _tally["completed"] += 1
         session["completed"] = True
         session["completed_at"] = datetime.datetime.now().isoformat()
-
-        # Save completed conversation to persistent storage
+        if escalation_info:
+            # Escalated sessions stay until the human feedback arrives, however
+            # long the reviewer takes; escalation_feedback() finishes them
+            sessions.pin(session_id)
+        else:
+            sessions.finish(session_id, settings.session_completed_grace_seconds)
+
+        # Saving and learning from the call (a symptom summary and an embedding
+        # request) happen off the critical path of the final reply
         conversation_data = {
             "messages": processor.get_history(),
             "data": processor.get_data(),
             "escalation_data": processor.get_escalation_data(),
         }
-        data_manager.save_conversation(user_message.session_id, conversation_data)
-
-        # Automatically add completed conversations to vector store for learning
-        try:
-            conversation = processor.get_history()
-            data = processor.get_data()
-
-            # Only add if we have routing information
-            if "routing" in data and data["routing"]:
-                routing = data["routing"]
-                if isinstance(routing, dict) and "route" in routing:
-                    correct_route = routing["route"]
-
-                    # Create symptoms summary
-                    symptoms_summary = llm_judge.extract_symptoms_summary(conversation)
-
-                    # Add to vector store
-                    vector_store.add_labeled_case(
-                        conversation,
-                        correct_route,
-                        symptoms_summary,
-                        user_message.session_id,
-                    )
-                    print(
-                        f"[Chat] Automatically added conversation to vector store: {correct_route}"
-                    )
-                else:
-                    print(f"[Chat] No valid routing found in data: {routing}")
-            else:
-                print(f"[Chat] No routing data available for vector store addition")
-        except Exception as e:
-            print(f"[Chat] Error adding conversation to vector store: {e}")
+        task = asyncio.create_task(
+            asyncio.to_thread(_archive_conversation, session_id, conversation_data)
+        )
+        _archive_tasks.add(task)
+        task.add_done_callback(_archive_tasks.discard)
 
     # Handle different modes
     mode = session.get("mode", "patient_intake")
@@ -129,69 +302,91 @@ async def chat(user_message: UserMessage):
     return response
 
 
+def _learn_from_feedback(
+    conversation: List[Dict[str, Any]], feedback: EscalationFeedback
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Judge human feedback, then store the evaluation and any training example."""
+    # Evaluate the prediction and create a training example using LLM Judge
+    evaluation, training_example = llm_judge.process_feedback(
+        conversation, feedback.agent_prediction, feedback.human_label
+    )
+
+    # Add to vector store if this should be used for training; the embedding
+    # request runs before taking the storage lock
+    entries = []
+    if training_example:
+        entries = vector_store.embed_labeled_cases(
+            [
+                {
+                    "conversation_messages": conversation,
+                    "correct_route": feedback.human_label,
+                    "symptoms_summary": training_example["symptoms_summary"],
+                    "session_id": feedback.session_id,
+                }
+            ]
+        )
+
+    with _storage_lock:
+        vector_store.add_embedded_cases(entries)
+
+        # Save evaluation to persistent storage
+        data_manager.save_evaluation(feedback.session_id, evaluation)
+    return evaluation, training_example
+
+
 @router.post("/escalation/feedback")
-async def escalation_feedback(feedback: EscalationFeedback):
+async def escalation_feedback(feedback: EscalationFeedback) -> Dict[str, Any]:
     """Handle human expert feedback on escalated cases."""
     session = sessions.get(feedback.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    processor = UnifiedProcessor(
-        session,
-        vector_store,
-        llm_judge,
-        openai_client,
-        settings.retrieval_threshold,
-        current_mode,
-    )
+    processor = _get_processor(session)
     conversation = processor.get_history()
 
-    # Create training example using LLM Judge
-    training_example = llm_judge.create_training_example(
-        conversation, feedback.agent_prediction, feedback.human_label
-    )
-
-    # Evaluate the prediction
-    evaluation = llm_judge.evaluate_prediction_accuracy(
-        feedback.agent_prediction, feedback.human_label, conversation
+    # The judge's LLM calls and the embedding request block, so run in a worker
+    evaluation, training_example = await asyncio.to_thread(
+        _learn_from_feedback, conversation, feedback
     )
 
-    # Add to vector store if this should be used for training
-    if llm_judge.should_add_to_training(evaluation):
-        symptoms_summary = training_example["symptoms_summary"]
-        vector_store.add_labeled_case(
-            conversation, feedback.human_label, symptoms_summary, feedback.session_id
-        )
-
     # Store evaluation for performance tracking
     if "evaluations" not in session:
         session["evaluations"] = []
     session["evaluations"].append(evaluation)
-
-    # Save evaluation to persistent storage
-    data_manager.save_evaluation(feedback.session_id, evaluation)
+    _record_evaluation(evaluation)
+    sessions.finish(feedback.session_id, settings.session_completed_grace_seconds)
 
     return {
         "message": "Feedback received and processed",
         "evaluation": evaluation,
-        "training_added": llm_judge.should_add_to_training(evaluation),
+        "training_added": training_example is not None,
     }
 
 
 @router.get("/vector_store/stats")
-async def vector_store_stats():
+async def vector_store_stats() -> Dict[str, Any]:
     """Get statistics about the vector store."""
     return vector_store.get_stats()
 
 
+def _record_evaluation(evaluation: Dict[str, Any], count: int = 1):
+    """Add an evaluation to the running totals (count=-1 takes it back out)."""
+    _tally["evaluations"] += count
+    if evaluation.get("prediction_correct", False):
+        _tally["correct"] += count
+    elif "prediction_correct" in evaluation:
+        key = LLMJudge.route_error_key(evaluation)
+        _route_errors[key] += count
+        if _route_errors[key] <= 0:
+            del _route_errors[key]
+
+
 @router.get("/system/performance")
-async def system_performance():
+async def system_performance() -> Dict[str, Any]:
     """Get overall system performance metrics."""
-    all_evaluations = []
-    for session in sessions.values():
-        all_evaluations.extend(session.get("evaluations", []))
-
-    performance = llm_judge.analyze_system_performance(all_evaluations)
+    performance = llm_judge.summarize_performance(
+        _tally["evaluations"], _tally["correct"], _route_errors
+    )
     suggestions = llm_judge.generate_improvement_suggestions(performance)
 
     return {
@@ -202,7 +397,7 @@ async def system_performance():
 
 
 @router.get("/dashboard/metrics")
-async def dashboard_metrics():
+async def dashboard_metrics() -> Dict[str, Any]:
     """Get comprehensive metrics for the dashboard."""
     # Use DataManager for persistent metrics
     escalation_metrics = data_manager.get_escalation_metrics()
@@ -210,37 +405,19 @@ async def dashboard_metrics():
     learning_curve = data_manager.compute_learning_curve()
     system_readiness = data_manager.compute_system_readiness()
 
-    # Get current session data
-    all_evaluations = []
-    for session in sessions.values():
-        all_evaluations.extend(session.get("evaluations", []))
-
-    # Get vector store conversations with metadata
-    vector_conversations = []
-    for conv in vector_store.conversations:
-        vector_conversations.append(
-            {
-                "id": conv.get("id"),
-                "symptoms_summary": conv.get("symptoms_summary", ""),
-                "correct_route": conv.get("correct_route", "unknown"),
-                "timestamp": conv.get("timestamp", ""),
-            }
-        )
-
     # Combine persistent data with current session data
     total_persistent_evaluations = len(data_manager.get_all_evaluations())
-    total_current_evaluations = len(all_evaluations)
+    total_current_evaluations = _tally["evaluations"]
 
     return {
-        "total_conversations": data_stats["total_conversations"]
-        + len([s for s in sessions.values() if s.get("completed", False)]),
+        "total_conversations": data_stats["total_conversations"] + _tally["completed"],
         "total_escalations": escalation_metrics["total_escalations"]
         + total_current_evaluations,
         "escalation_rate": escalation_metrics["escalation_rate"],
         "necessary_escalations": escalation_metrics["necessary_escalations"],
         "unnecessary_escalations": escalation_metrics["unnecessary_escalations"],
         "escalation_precision": escalation_metrics["escalation_precision"],
-        "vector_conversations": vector_conversations,
+        "vector_conversations": vector_store.projected_conversations,
         "recent_activity": data_stats["recent_activity"],
         "learning_curve": learning_curve,
         "data_size_mb": data_stats["data_size_mb"],
@@ -252,8 +429,19 @@ async def dashboard_metrics():
     }
 
 
+@router.get("/dashboard/metrics/summary")
+async def dashboard_metrics_summary() -> Dict[str, Any]:
+    """Get count-only dashboard metrics without the per-conversation payload."""
+    return {
+        "total_conversations": data_manager.count_conversations() + _tally["completed"],
+        "total_evaluations": len(data_manager.get_all_evaluations())
+        + _tally["evaluations"],
+        "vector_store_size": len(vector_store.conversations),
+    }
+
+
 @router.post("/dashboard/demo")
-async def run_demo_scenarios():
+async def run_demo_scenarios() -> Dict[str, Any]:
     """Run predefined demo scenarios to show learning progression."""
     demo_scenarios = [
         {
@@ -330,6 +518,7 @@ async def run_demo_scenarios():
         },
     ]
 
+    training_cases = []
     for scenario in demo_scenarios:
         # Create demo session
         session_id = f"demo_{scenario['name'].replace(' ', '_').lower()}"
@@ -345,51 +534,102 @@ async def run_demo_scenarios():
         }
         session["evaluations"].append(evaluation)
         sessions[session_id] = session
+        previous = _demo_evaluations.get(session_id)
+        if previous is not None:
+            _record_evaluation(previous, -1)
+        _demo_evaluations[session_id] = evaluation
+        _record_evaluation(evaluation)
 
         # Add to vector store if judgment says to
         if llm_judge.should_add_to_training(evaluation):
             symptoms_summary = " | ".join(
                 [msg["content"] for msg in scenario["conversation"]]
             )
-            demo_session_id = f"demo_{scenario['name'].replace(' ', '_').lower()}"
-            vector_store.add_labeled_case(
-                scenario["conversation"],
-                scenario["correct_route"],
-                symptoms_summary,
-                demo_session_id,
+            training_cases.append(
+                {
+                    "conversation_messages": scenario["conversation"],
+                    "correct_route": scenario["correct_route"],
+                    "symptoms_summary": symptoms_summary,
+                    "session_id": session_id,
+                }
             )
 
+    # One embeddings request for every scenario selected for training
+    def add_training_cases():
+        entries = vector_store.embed_labeled_cases(training_cases)
+        with _storage_lock:
+            vector_store.add_embedded_cases(entries)
+
+    await asyncio.to_thread(add_training_cases)
+
     return {"message": f"Demo completed: {len(demo_scenarios)} scenarios processed"}
 
 
+# orjson options for the export; metrics may carry non-string keys or numpy values
+EXPORT_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _json_array(items: Iterable[bytes]) -> Iterator[bytes]:
+    """Wrap already-encoded JSON values in an array, one chunk per value."""
+    yield b"["
+    for i, item in enumerate(items):
+        yield b"," + item if i else item
+    yield b"]"
+
+
+def _iter_export_json() -> Iterator[bytes]:
+    """Encode the system export piece by piece so memory stays flat."""
+
+    def field(key: str, value: Any) -> bytes:
+        return (
+            orjson.dumps(key) + b":" + orjson.dumps(value, option=EXPORT_JSON_OPTIONS)
+        )
+
+    # Persisted records are already JSON lines and are passed through unparsed
+    yield b'{"conversations":'
+    yield from _json_array(data_manager.iter_raw_conversations())
+    yield b',"evaluations":'
+    yield from _json_array(data_manager.iter_raw_evaluations())
+    yield b"," + field("system_metrics", data_manager.get_system_metrics())
+    yield b"," + field("sessions", data_manager.load_sessions())
+    yield b"," + field("escalation_metrics", data_manager.get_escalation_metrics())
+    yield b"," + field("learning_curve", data_manager.compute_learning_curve())
+    yield b"," + field("export_timestamp", datetime.datetime.now().isoformat())
+
+    # Current session data
+    yield b',"current_sessions":{'
+    for i, (session_id, session) in enumerate(sessions.items()):
+        exported = {k: v for k, v in session.items() if not k.startswith("_")}
+        yield (b"," if i else b"") + field(session_id, exported)
+    yield b'},"vector_store":{"conversations":'
+    yield from _json_array(
+        orjson.dumps(conv, option=EXPORT_JSON_OPTIONS)
+        for conv in vector_store.conversations
+    )
+    yield b"," + field("stats", vector_store.get_stats()) + b"}}"
+
+
 @router.get("/dashboard/export")
 async def export_system_data():
     """Export all system data for analysis."""
-    # Use DataManager for comprehensive export
-    export_data = data_manager.export_all_data()
-
-    # Add current session data
-    export_data["current_sessions"] = dict(sessions)
-    export_data["vector_store"] = {
-        "conversations": vector_store.conversations,
-        "stats": vector_store.get_stats(),
-    }
-
-    return JSONResponse(
-        content=export_data,
+    return StreamingResponse(
+        _iter_export_json(),
+        media_type="application/json",
         headers={"Content-Disposition": "attachment; filename=siva_export.json"},
     )
 
 
 @router.post("/dashboard/reset")
-async def reset_system():
+async def reset_system() -> Dict[str, Any]:
     """Reset all system data (for demo purposes)."""
     global sessions
     sessions.clear()
+    _tally.clear()
+    _route_errors.clear()
+    _demo_evaluations.clear()
 
     # Reset vector store
-    vector_store.conversations.clear()
-    vector_store.save_data()
+    vector_store.clear()
 
     # Reset persistent data
     data_manager.reset_all_data()
@@ -398,27 +638,21 @@ async def reset_system():
 
 
 @router.get("/")
-def root():
+def root() -> Dict[str, str]:
     """Root endpoint."""
     return {"message": "SIVA Unified API is running."}
 
 
 @router.get("/evidence/{session_id}")
-async def get_real_time_evidence(session_id: str):
+async def get_real_time_evidence(session_id: str) -> Dict[str, Any]:
     """Get real-time evidence for display panel."""
     session = sessions.get(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    processor = UnifiedProcessor(
-        session,
-        vector_store,
-        llm_judge,
-        openai_client,
-        settings.retrieval_threshold,
-        current_mode,
-    )
-    evidence = processor.get_real_time_evidence()
+    processor = _get_processor(session)
+    # Similar-case retrieval embeds the transcript with a blocking request
+    evidence = await asyncio.to_thread(processor.get_real_time_evidence)
 
     return {
         "session_id": session_id,
@@ -428,7 +662,7 @@ async def get_real_time_evidence(session_id: str):
 
 
 @router.post("/mode/switch")
-async def switch_mode(mode_request: ModeRequest):
+async def switch_mode(mode_request: ModeRequest) -> Dict[str, Any]:
     """Switch between patient intake and physician consultation modes."""
     global current_mode
     if mode_request.mode in ["patient_intake", "physician_consultation"]:
@@ -442,7 +676,7 @@ async def switch_mode(mode_request: ModeRequest):
 
 
 @router.post("/mode/toggle")
-async def toggle_mode(mode_request: ModeRequest):
+async def toggle_mode(mode_request: ModeRequest) -> Dict[str, Any]:
     """Toggle between patient intake and physician consultation modes."""
     global current_mode
     if current_mode == "patient_intake":
@@ -454,7 +688,7 @@ async def toggle_mode(mode_request: ModeRequest):
 
 
 @router.get("/mode/current")
-async def get_current_mode():
+async def get_current_mode() -> Dict[str, Any]:
     """Get current application mode."""
     return {"mode": current_mode}
 
@@ -1,174 +1,621 @@
 """WebSocket handlers for SIVA application."""
 
-import os
-import tempfile
-from fastapi import WebSocket
+import asyncio
+import hashlib
+import io
+import logging
+import struct
+import numpy as np
+import orjson
+from collections import OrderedDict
+from typing import Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect
 from cartesia import AsyncCartesia
-from openai import OpenAI
+
+from core.processor import openai_semaphore
+from core.schemas import UserMessage
+from . import routes
+
+logger = logging.getLogger("siva.websockets")
 
 # Import new settings module
 try:
     from siva.settings import settings
 
-    print("Using new SIVA settings")
+    logger.debug("Using new SIVA settings")
 except ImportError:
     # Fallback to old settings for backward compatibility
     from config.settings import settings
 
-    print("Using old SIVA settings")
+    logger.debug("Using old SIVA settings")
+
+# Raw audio format requested from Cartesia and played back by the voice client;
+# 16-bit PCM at 24 kHz is plenty for speech and keeps the wire payload small
+TTS_OUTPUT_FORMAT = {
+    "container": "raw",
+    "encoding": "pcm_s16le",
+    "sample_rate": 24000,
+}
+
+# Streamed reply text is flushed to TTS whenever one of these arrives
+SENTENCE_TERMINATORS = (".", "?", "!")
+
+# Clause punctuation also flushes once at least MIN_CLAUSE_CHARS are pending, so a
+# long opening sentence starts speaking before it is finished
+CLAUSE_TERMINATORS = (",", ";", ":")
+MIN_CLAUSE_CHARS = 24
+
+# Audio chunks that queue up while a frame is being sent go out together in the
+# next frame, up to this many bytes (~1.4 s of 24 kHz s16 mono PCM)
+AUDIO_BATCH_MAX_BYTES = 64 * 1024
+
+# Chunks read ahead of a slow client before Cartesia reads pause (backpressure);
+# about one AUDIO_BATCH_MAX_BYTES frame of typical chunks
+AUDIO_QUEUE_CHUNKS = 32
+
+# After the first frame, a batch holding less than 25 ms of audio waits up to
+# AUDIO_BATCH_LINGER_S for more chunks before it is sent
+AUDIO_BATCH_MIN_BYTES = TTS_OUTPUT_FORMAT["sample_rate"] * 2 * 25 // 1000
+AUDIO_BATCH_LINGER_S = 0.01
+
+# Number of Cartesia TTS WebSockets kept open and reused across voice turns
+TTS_POOL_SIZE = 4
+
+# Long-lived Cartesia client shared by every connection
+cartesia_client = AsyncCartesia(api_key=settings.cartesia_api_key)
+
+# In-process faster-whisper model, loaded on startup when stt_local_model is set
+_local_stt_model = None
+
+# Local transcriptions allowed to run at once; each call already spreads over
+# several cores, so more parallel decodes would only thrash
+STT_LOCAL_CONCURRENCY = 2
+_local_stt_slots = asyncio.Semaphore(STT_LOCAL_CONCURRENCY)
+# Decodes still running after their caller was cancelled; each holds its slot
+# until the worker thread returns
+_local_stt_decodes: Set[asyncio.Task] = set()
+
+# Raw audio accepted by /ws/stt?format=pcm16: mono s16le at the rate Whisper models
+# run at, so the local model needs no decoding step
+STT_PCM_SAMPLE_RATE = 16000
+
+# PCM utterances are only transcribed if they hold at least STT_MIN_SAMPLES of
+# audio and STT_MIN_VOICED_FRAMES 30 ms frames louder than STT_SPEECH_RMS (the
+# voice client's speech level); silence gets an empty transcript instead of a
+# model call, which also avoids Whisper hallucinating text on near-silent input
+STT_MIN_SAMPLES = STT_PCM_SAMPLE_RATE // 4
+STT_VAD_FRAME_SAMPLES = STT_PCM_SAMPLE_RATE * 30 // 1000
+STT_SPEECH_RMS = 0.02
+STT_MIN_VOICED_FRAMES = 3
+
+# Final transcripts keyed by a digest of the utterance audio, so a resent clip
+# (client retry, test loop) skips transcription; only touched on the event loop
+TRANSCRIPT_CACHE_SIZE = 512
+_transcript_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+# Pool of Cartesia TTS WebSockets; None marks a slot that still needs connecting
+_tts_pool: asyncio.Queue = asyncio.Queue(maxsize=TTS_POOL_SIZE)
+for _ in range(TTS_POOL_SIZE):
+    _tts_pool.put_nowait(None)
+
+
+async def _connect_tts_ws():
+    ws = await cartesia_client.tts.websocket()
+    await ws.connect()
+    return ws
+
+
+async def _acquire_tts_ws():
+    """Take a Cartesia TTS WebSocket from the pool, connecting the slot if needed."""
+    ws = await _tts_pool.get()
+    if ws is None:
+        try:
+            ws = await _connect_tts_ws()
+        except BaseException:
+            # Also covers cancellation, so the slot is never lost
+            _tts_pool.put_nowait(None)
+            raise
+    return ws
+
+
+async def _release_tts_ws(ws, healthy: bool = True):
+    """Return a WebSocket to the pool; broken ones are closed and reconnected later."""
+    if not healthy:
+        try:
+            await ws.close()
+        except Exception:
+            pass
+        ws = None
+    _tts_pool.put_nowait(ws)
+
+
+async def _close_quietly(websocket: WebSocket):
+    """Close a client socket once its payload is delivered.
+
+    A client that hung up first is not an error: the turn is complete, and the
+    pooled Cartesia socket that served it stays healthy.
+    """
+    try:
+        await websocket.close()
+    except Exception as e:
+        logger.debug("WebSocket already closed by the client: %s", e)
+
+
+async def _send_audio_batched(websocket: WebSocket, chunks) -> int:
+    """Forward audio chunks to the client, coalescing chunks that arrive in bursts.
+
+    A reader task queues chunks as they arrive, up to AUDIO_QUEUE_CHUNKS ahead of
+    the client; the queue absorbs Cartesia's bursts and, when full, pauses reads
+    until the client catches up. Each send takes everything already queued, so a
+    burst costs a single frame. The first chunk is sent the moment it arrives;
+    later batches under AUDIO_BATCH_MIN_BYTES linger briefly to grow.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIO_QUEUE_CHUNKS)
+
+    async def read():
+        # None marks the end of the stream, including when the source fails
+        try:
+            async for audio in chunks:
+                await queue.put(audio)
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    reader = asyncio.create_task(read())
+    # Bound once as locals, since the loop below runs for every audio chunk
+    max_bytes = AUDIO_BATCH_MAX_BYTES
+    min_bytes = AUDIO_BATCH_MIN_BYTES
+    linger = AUDIO_BATCH_LINGER_S
+    get, get_nowait, empty = queue.get, queue.get_nowait, queue.empty
+    send_bytes = websocket.send_bytes
+    frames = 0
+    try:
+        finished = False
+        while not finished:
+            audio = await get()
+            if audio is None:
+                break
+            parts = [audio]
+            size = len(audio)
+            while size < max_bytes:
+                if not empty():
+                    audio = get_nowait()
+                elif frames and size < min_bytes:
+                    try:
+                        audio = await asyncio.wait_for(get(), linger)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    break
+                if audio is None:
+                    finished = True
+                    break
+                parts.append(audio)
+                size += len(audio)
+            await send_bytes(parts[0] if len(parts) == 1 else b"".join(parts))
+            frames += 1
+        # Surface errors raised by the chunk source
+        await reader
+    finally:
+        reader.cancel()
+    return frames
+
+
+async def open_tts_pool():
+    """Pre-open the pooled Cartesia WebSockets (called on app startup)."""
+    opened = 0
+    for _ in range(TTS_POOL_SIZE):
+        ws = await _tts_pool.get()
+        if ws is None:
+            try:
+                ws = await _connect_tts_ws()
+                opened += 1
+            except Exception as e:
+                logger.warning("Could not pre-open Cartesia WebSocket: %s", e)
+        _tts_pool.put_nowait(ws)
+    logger.info("%d/%d Cartesia WebSockets ready", opened, TTS_POOL_SIZE)
+
+
+def load_local_stt_model():
+    """Load the configured faster-whisper model (called on app startup).
+
+    Leaves STT on OpenAI Whisper when no local model is configured or
+    faster-whisper is not installed.
+    """
+    global _local_stt_model
+    if not settings.stt_local_model:
+        return
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError:
+        logger.warning("faster-whisper is not installed; using OpenAI Whisper for STT")
+        return
+    _local_stt_model = WhisperModel(
+        settings.stt_local_model,
+        device="auto",
+        compute_type=settings.stt_local_compute_type,
+    )
+    logger.info("Local STT model %s loaded", settings.stt_local_model)
+
+
+def _pcm_to_float(audio_data: bytes) -> np.ndarray:
+    """Convert s16le PCM to the float32 samples faster-whisper takes directly."""
+    samples = np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+    return samples.astype(np.float32) * (1 / 32768.0)
+
+
+def _has_speech(audio_data: bytes) -> bool:
+    """Cheap energy check deciding whether PCM audio is worth transcribing."""
+    samples = _pcm_to_float(audio_data)
+    if len(samples) < STT_MIN_SAMPLES:
+        return False
+    usable = len(samples) // STT_VAD_FRAME_SAMPLES * STT_VAD_FRAME_SAMPLES
+    frames = samples[:usable].reshape(-1, STT_VAD_FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return np.count_nonzero(rms > STT_SPEECH_RMS) >= STT_MIN_VOICED_FRAMES
+
+
+def _pcm_to_wav(audio_data: bytes) -> bytes:
+    """Wrap s16le PCM in a WAV header for the OpenAI transcription upload."""
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + len(audio_data),
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        1,  # mono
+        STT_PCM_SAMPLE_RATE,
+        STT_PCM_SAMPLE_RATE * 2,
+        2,
+        16,
+        b"data",
+        len(audio_data),
+    )
+    return header + audio_data
+
+
+def _transcribe_local(audio_data: bytes, pcm: bool = False) -> str:
+    """Transcribe with the local model (blocking; run in a worker thread).
+
+    Raw PCM is passed to the model as samples; anything else is decoded from its
+    container first.
+    """
+    audio = _pcm_to_float(audio_data) if pcm else io.BytesIO(audio_data)
+    # Greedy decoding (beam_size=1) is plenty for short single-utterance turns
+    segments, _ = _local_stt_model.transcribe(
+        audio, language="en", beam_size=1, vad_filter=True
+    )
+    # Segments are decoded lazily, so consume them here rather than on the loop
+    return "".join(segment.text for segment in segments)
+
+
+async def _transcribe_local_async(audio_data: bytes, pcm: bool) -> str:
+    """Run _transcribe_local in a worker thread once a decode slot is free.
+
+    A cancelled caller (e.g. a superseded partial transcript) cannot stop the
+    thread, so the slot is released when the decode finishes, not when the
+    caller leaves.
+    """
+    await _local_stt_slots.acquire()
+    decode = asyncio.create_task(asyncio.to_thread(_transcribe_local, audio_data, pcm))
+    _local_stt_decodes.add(decode)
+    decode.add_done_callback(_finish_local_decode)
+    return await asyncio.shield(decode)
+
+
+def _finish_local_decode(decode: asyncio.Task):
+    _local_stt_decodes.discard(decode)
+    _local_stt_slots.release()
+    if not decode.cancelled() and decode.exception() is not None:
+        # Retrieved here so abandoned decodes don't log "never retrieved"
+        logger.debug("Local transcription failed: %s", decode.exception())
+
+
+def _get_cached_transcript(key: bytes) -> Optional[str]:
+    text = _transcript_cache.get(key)
+    if text is not None:
+        _transcript_cache.move_to_end(key)
+    return text
+
+
+def _cache_transcript(key: bytes, text: str):
+    _transcript_cache[key] = text
+    _transcript_cache.move_to_end(key)
+    if len(_transcript_cache) > TRANSCRIPT_CACHE_SIZE:
+        _transcript_cache.popitem(last=False)
+
+
+async def close_tts_pool():
+    """Close the pooled Cartesia WebSockets and the shared client (app shutdown)."""
+    for _ in range(TTS_POOL_SIZE):
+        ws = await _tts_pool.get()
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+        _tts_pool.put_nowait(None)
+    await cartesia_client.close()
+    logger.info("Cartesia client closed")
 
 
 async def websocket_tts(websocket: WebSocket):
     """Handle Text-to-Speech WebSocket connections."""
-    print("TTS WebSocket connection received")
     await websocket.accept()
-    print("TTS WebSocket accepted")
-
-    # Debug: Print settings values
-    print(
-        f"Cartesia API key: {settings.cartesia_api_key[:10]}..."
-        if settings.cartesia_api_key
-        else "No Cartesia API key"
+    logger.debug(
+        "TTS WebSocket accepted (model=%s, voice=%s)",
+        settings.sonic_model_id,
+        settings.voice_id,
     )
-    print(f"Sonic model ID: {settings.sonic_model_id}")
-    print(f"Voice ID: {settings.voice_id}")
 
-    client = AsyncCartesia(api_key=settings.cartesia_api_key)
-    print("Cartesia client created")
+    ws = None
+    healthy = True
     try:
-        print("Waiting for text message...")
         data = await websocket.receive_text()
-        print(f"Received text: {data[:50]}...")
+        logger.debug("TTS text received: %.50s", data)
 
-        print("Creating Cartesia WebSocket...")
-        ws = await client.tts.websocket()
-        print("Cartesia WebSocket created, sending request...")
+        ws = await _acquire_tts_ws()
 
         output_generate = await ws.send(
             model_id=settings.sonic_model_id,
             transcript=data,
             voice={"id": settings.voice_id},
-            output_format={
-                "container": "raw",
-                "encoding": "pcm_f32le",
-                "sample_rate": 44100,
-            },
+            output_format=TTS_OUTPUT_FORMAT,
             stream=True,
         )
-        print("TTS request sent, processing audio chunks...")
 
-        chunk_count = 0
-        async for out in output_generate:
-            if out.audio is not None:
-                chunk_count += 1
-                print(f"Sending chunk {chunk_count}: {len(out.audio)} bytes")
-                await websocket.send_bytes(out.audio)
-
-        print(f"Finished sending {chunk_count} chunks")
-        await ws.close()
-        print("Cartesia WebSocket closed")
+        frames = await _send_audio_batched(
+            websocket,
+            (out.audio async for out in output_generate if out.audio is not None),
+        )
+        logger.debug("TTS sent %d audio frames", frames)
 
-        # Close the WebSocket connection gracefully
-        await websocket.close()
-        print("Frontend WebSocket closed")
+        await _close_quietly(websocket)
 
     except Exception as e:
-        print(f"TTS WebSocket error: {e}")
-        import traceback
-
-        traceback.print_exc()
-        try:
-            await websocket.close()
-        except:
-            pass
+        logger.exception("TTS WebSocket error: %s", e)
+        healthy = False
+        await _close_quietly(websocket)
     finally:
-        await client.close()
-        print("Cartesia client closed")
+        if ws is not None:
+            await _release_tts_ws(ws, healthy)
 
 
-async def websocket_stt(websocket: WebSocket):
-    """Handle Speech-to-Text WebSocket connections."""
-    print("STT WebSocket connection received")
-    await websocket.accept()
-    print("STT WebSocket accepted")
+async def websocket_chat(websocket: WebSocket):
+    """Handle a full voice turn on one duplex WebSocket.
 
-    # Initialize OpenAI client
-    client = OpenAI(api_key=settings.openai_api_key)
+    The client sends {"session_id", "message"}; the agent reply is streamed from
+    the LLM and flushed sentence by sentence into a single Cartesia context, so
+    audio chunks reach the client while the rest of the reply is still being
+    generated. The /chat response payload is sent as a final JSON text frame.
+    """
+    await websocket.accept()
 
+    tts_task = None
+    tts_ws = None
+    healthy = True
+    forwarder = None
     try:
-        print("[STT] Waiting for single audio chunk from client")
-        # Receive a single audio message from the client
-        audio_data = await websocket.receive_bytes()
-        print(f"[STT] Received audio chunk: {len(audio_data)} bytes")
+        turn = UserMessage.model_validate_json(await websocket.receive_text())
+        session = routes.sessions.get(turn.session_id, {})
+        if session.get("mode", routes.current_mode) == "physician_consultation":
+            # Silent mode: nothing is spoken, just return the payload
+            response = await routes.process_chat_turn(turn.session_id, turn.message)
+            await websocket.send_text(orjson.dumps(response).decode())
+            await _close_quietly(websocket)
+            return
 
-        print(f"[STT] Total audio received: {len(audio_data)} bytes")
+        # Take a pooled Cartesia socket (connecting the slot if needed) while the
+        # LLM starts generating; it is only awaited once the first sentence is ready
+        tts_task = asyncio.create_task(_acquire_tts_ws())
+        ctx = None
+        spoken = []
+        pending = ""
+
+        async def speak(text: str):
+            nonlocal tts_ws, ctx, forwarder
+            if ctx is None:
+                tts_ws = await tts_task
+                ctx = tts_ws.context()
+                forwarder = asyncio.create_task(forward_audio())
+            spoken.append(text)
+            await ctx.send(
+                model_id=settings.sonic_model_id,
+                transcript=text,
+                voice={"id": settings.voice_id},
+                output_format=TTS_OUTPUT_FORMAT,
+                continue_=True,
+            )
+
+        async def on_text_delta(delta: str):
+            nonlocal pending
+            pending += delta
+            cut = max(pending.rfind(t) for t in SENTENCE_TERMINATORS)
+            if cut < 0 and len(pending) >= MIN_CLAUSE_CHARS:
+                cut = max(pending.rfind(t) for t in CLAUSE_TERMINATORS)
+            if cut >= 0:
+                sentence, pending = pending[: cut + 1], pending[cut + 1 :]
+                if sentence.strip():
+                    await speak(sentence)
+
+        async def forward_audio():
+            # WebsocketResponse.audio base64-decodes on every access, so read it
+            # once per event
+            frames = await _send_audio_batched(
+                websocket,
+                (
+                    audio
+                    async for out in ctx.receive()
+                    if (audio := getattr(out, "audio", None))
+                ),
+            )
+            logger.debug("Chat turn forwarded %d audio frames", frames)
+
+        response = await routes.process_chat_turn(
+            turn.session_id, turn.message, on_text_delta
+        )
 
-        if len(audio_data) == 0:
-            print("[STT] No audio data received")
-            try:
-                await websocket.send_text("")
-                print("[STT] Sent empty response to client")
-            except Exception:
-                print("[STT] Could not send empty response (WebSocket closed)")
-            return
+        if pending.strip():
+            await speak(pending)
+        # Canned replies (routing/escalation) are not streamed from the model
+        reply = (response.get("reply") or "").strip()
+        if reply and not "".join(spoken).strip().endswith(reply):
+            await speak(reply)
 
-        # Save audio to temporary file for OpenAI Whisper
-        # Create temporary file with .wav extension
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_filename = temp_file.name
-        print(f"[STT] Audio written to temp file: {temp_filename}")
+        if spoken:
+            await ctx.no_more_inputs()
+            await forwarder
 
-        try:
-            # Use OpenAI Whisper for transcription
-            print("[STT] Sending audio to OpenAI Whisper...")
-            with open(temp_filename, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model=settings.openai_whisper_model, file=audio_file, language="en"
-                )
+        await websocket.send_text(orjson.dumps(response).decode())
+        await _close_quietly(websocket)
+        logger.debug("Chat turn complete for session %s", turn.session_id)
+
+    except Exception as e:
+        logger.exception("Chat WebSocket error: %s", e)
+        healthy = False
+        await _close_quietly(websocket)
+    finally:
+        if forwarder is not None and not forwarder.done():
+            forwarder.cancel()
+            healthy = False
+        if tts_ws is None and tts_task is not None:
+            # Nothing was spoken: return the socket if it arrived, else stop waiting
+            if tts_task.done() and not tts_task.cancelled():
+                if tts_task.exception() is None:
+                    tts_ws = tts_task.result()
+            else:
+                tts_task.cancel()
+        if tts_ws is not None:
+            await _release_tts_ws(tts_ws, healthy)
+
+
+async def _send_partial_transcript(websocket: WebSocket, audio_data: bytes, pcm: bool):
+    """Decode the audio received so far and send it as a partial transcript."""
+    try:
+        text = await _transcribe_local_async(audio_data, pcm)
+        await websocket.send_text(text.strip())
+    except Exception as e:
+        logger.debug("STT partial transcript failed: %s", e)
 
-            result_text = transcript.text.strip()
-            print(f"[STT] Whisper transcript: '{result_text}'")
 
-            # Send transcript back to client
-            try:
-                await websocket.send_text(result_text)
-                print(f"[STT] Transcript sent to client: '{result_text}'")
+async def _send_final_transcript(websocket: WebSocket, text: str, binary: bool):
+    """Send the final transcript, as a binary UTF-8 frame if the client asked."""
+    if binary:
+        await websocket.send_bytes(text.encode())
+    else:
+        await websocket.send_text(text)
 
-                # Close the WebSocket gracefully after sending response
-                await websocket.close()
-                print("[STT] WebSocket closed gracefully after sending transcript")
 
-            except Exception as send_error:
-                print(
-                    f"[STT] Could not send transcript (WebSocket may be closed): {send_error}"
+async def _receive_utterance(websocket: WebSocket, pcm: bool) -> bytes:
+    """Accumulate streamed audio until the empty end-of-utterance frame.
+
+    With a local model, partial transcripts are sent while the audio arrives.
+    """
+    audio = bytearray()
+    partial = None
+    try:
+        while True:
+            chunk = await websocket.receive_bytes()
+            if not chunk:
+                return bytes(audio)
+            audio += chunk
+            # Partials are best-effort and never queue for a busy decode slot
+            if (
+                _local_stt_model is not None
+                and (partial is None or partial.done())
+                and not _local_stt_slots.locked()
+            ):
+                partial = asyncio.create_task(
+                    _send_partial_transcript(websocket, bytes(audio), pcm)
                 )
+    finally:
+        if partial is not None:
+            # The final transcript supersedes any partial still decoding
+            partial.cancel()
+
+
+async def _transcribe_utterance(audio_data: bytes, pcm: bool) -> str:
+    """Transcribe one utterance; silence and empty audio give an empty string."""
+    if len(audio_data) == 0 or (pcm and not _has_speech(audio_data)):
+        logger.debug("STT skipped: no speech in %d bytes", len(audio_data))
+        return ""
+
+    cache_key = hashlib.blake2b(audio_data, digest_size=16).digest()
+    text = _get_cached_transcript(cache_key)
+    if text is None:
+        if _local_stt_model is not None:
+            # Local faster-whisper keeps the network round trip off the turn
+            text = await _transcribe_local_async(audio_data, pcm)
+        else:
+            # Use OpenAI Whisper for transcription, uploading the bytes directly;
+            # the plain-text response format comes back as a str
+            async with openai_semaphore:
+                text = await routes.openai_client.audio.transcriptions.create(
+                    model=settings.openai_whisper_model,
+                    file=(
+                        "audio.wav",
+                        _pcm_to_wav(audio_data) if pcm else audio_data,
+                        "audio/wav",
+                    ),
+                    language="en",
+                    response_format="text",
+                )
+        _cache_transcript(cache_key, text)
+    return text.strip()
+
+
+async def websocket_stt(websocket: WebSocket):
+    """Handle Speech-to-Text WebSocket connections.
+
+    The client streams audio chunks while the user is speaking and sends an empty
+    frame at the end of the utterance. With a local model, partial transcripts are
+    sent back as audio arrives.
+
+    Connecting with ?format=pcm16 declares raw 16 kHz mono s16le audio instead of
+    an encoded recording. With ?framing=binary the final transcript arrives as a
+    binary frame (partials stay text) and the socket stays open for the next
+    utterance; otherwise the final transcript is the last text frame before the
+    server closes.
+    """
+    await websocket.accept()
+    pcm = websocket.query_params.get("format") == "pcm16"
+    binary_final = websocket.query_params.get("framing") == "binary"
+
+    try:
+        while True:
+            audio_data = await _receive_utterance(websocket, pcm)
+            logger.debug("STT received %d bytes of audio", len(audio_data))
 
-        except Exception as e:
-            print(f"[STT] OpenAI Whisper error: {e}")
             try:
-                await websocket.send_text("")
-                print("[STT] Sent empty response to client after Whisper error")
-            except Exception:
-                print("[STT] Could not send empty response (WebSocket may be closed)")
+                result_text = await _transcribe_utterance(audio_data, pcm)
+            except Exception as e:
+                logger.error("STT Whisper error: %s", e)
+                result_text = ""
+            logger.debug("STT transcript: %r", result_text)
 
-        finally:
-            # Clean up temporary file
             try:
-                os.unlink(temp_filename)
-                print(f"[STT] Temporary audio file cleaned up: {temp_filename}")
-            except Exception:
-                print(f"[STT] Could not clean up temp file: {temp_filename}")
+                await _send_final_transcript(websocket, result_text, binary_final)
+            except Exception as send_error:
+                logger.debug(
+                    "STT could not send transcript (WebSocket may be closed): %s",
+                    send_error,
+                )
+                return
 
-        print("[STT] STT processing complete")
+            if not binary_final:
+                # The close tells text-framed clients the transcript is final
+                await _close_quietly(websocket)
+                return
 
+    except WebSocketDisconnect:
+        logger.debug("STT client disconnected")
     except Exception as e:
-        print(f"STT WebSocket error: {e}")
-        import traceback
-
-        traceback.print_exc()
+        logger.exception("STT WebSocket error: %s", e)
         try:
-            await websocket.send_text("")
+            await _send_final_transcript(websocket, "", binary_final)
             await websocket.close()
         except Exception:
             pass
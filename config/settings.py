@@ -52,7 +52,8 @@ class SivaSettings(BaseSettings):
         default="text-embedding-3-small", description="OpenAI model for embeddings"
     )
     openai_whisper_model: str = Field(
-        default="whisper-1", description="OpenAI model for speech-to-text"
+        default="gpt-4o-mini-transcribe",
+        description="OpenAI model for speech-to-text",
     )
     openai_max_tokens: int = Field(
         default=300, description="Maximum tokens for OpenAI responses"
@@ -61,6 +62,39 @@ class SivaSettings(BaseSettings):
         default=0.3, description="Temperature for OpenAI responses"
     )
 
+    # LLM Judge Configuration
+    llm_judge_local_model: Optional[str] = Field(
+        default=None,
+        description="Local (Ollama) model for symptom summaries; OpenAI if unset",
+    )
+    llm_judge_local_url: str = Field(
+        default="http://localhost:11434",
+        description="Base URL of the local model server",
+    )
+
+    # Local Speech-to-Text
+    stt_local_model: Optional[str] = Field(
+        default=None,
+        description="Local faster-whisper model for speech-to-text; OpenAI if unset",
+    )
+    stt_local_compute_type: str = Field(
+        default="int8", description="faster-whisper compute type (e.g. int8, float16)"
+    )
+
+    # Session Storage
+    session_max_count: int = Field(
+        default=10_000,
+        description="Maximum number of in-memory sessions before LRU eviction",
+    )
+    session_ttl_seconds: int = Field(
+        default=3600,
+        description="Seconds of inactivity after which a session is dropped",
+    )
+    session_completed_grace_seconds: int = Field(
+        default=300,
+        description="Seconds a finished session is kept before it is dropped",
+    )
+
     # Application Mode
     current_mode: str = Field(
         default="patient_intake",
@@ -72,6 +106,9 @@ class SivaSettings(BaseSettings):
     cors_credentials: bool = Field(default=True, description="Allow CORS credentials")
     cors_methods: list[str] = Field(default=["*"], description="Allowed CORS methods")
     cors_headers: list[str] = Field(default=["*"], description="Allowed CORS headers")
+    cors_max_age: int = Field(
+        default=86400, description="Seconds browsers may cache CORS preflight responses"
+    )
 
     class Config:
         """Pydantic configuration."""
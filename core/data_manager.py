@@ -1,11 +1,17 @@
 """Data manager for persistent storage and management of SIVA system data."""
 
-import json
 import os
 import datetime
-from typing import Dict, List, Any, Optional
+import logging
+import orjson
+from typing import Dict, Iterator, List, Any, Optional
 from pathlib import Path
 
+logger = logging.getLogger("siva.data_manager")
+
+# Keep json.dump's leniency for non-string keys; also accept numpy scalars
+JSON_WRITE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
 
 class DataManager:
     """Manages persistent storage of conversations, evaluations, and system metrics."""
@@ -45,34 +51,49 @@ class DataManager:
 
     def _save_json(self, file_path: Path, data: Dict):
         """Save JSON data to file."""
-        with open(file_path, "w") as f:
-            json.dump(data, f, indent=2)
+        with open(file_path, "wb") as f:
+            f.write(orjson.dumps(data, option=JSON_WRITE_OPTIONS | orjson.OPT_INDENT_2))
 
     def _load_json(self, file_path: Path) -> Dict:
         """Load JSON data from file."""
         try:
-            with open(file_path, "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
+            with open(file_path, "rb") as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
             return {}
 
     def _append_jsonl(self, file_path: Path, data: Dict):
         """Append data to JSONL file."""
-        with open(file_path, "a") as f:
-            f.write(json.dumps(data) + "\n")
+        with open(file_path, "ab") as f:
+            f.write(orjson.dumps(data, option=JSON_WRITE_OPTIONS) + b"\n")
 
     def _read_jsonl(self, file_path: Path) -> List[Dict]:
         """Read all data from JSONL file."""
         data = []
         try:
-            with open(file_path, "r") as f:
+            with open(file_path, "rb") as f:
                 for line in f:
                     if line.strip():
-                        data.append(json.loads(line))
+                        data.append(orjson.loads(line))
         except FileNotFoundError:
             pass
         return data
 
+    def _iter_jsonl_raw(self, file_path: Path) -> Iterator[bytes]:
+        """Yield each JSONL record as its raw JSON bytes, without parsing it."""
+        try:
+            with open(file_path, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line
+        except FileNotFoundError:
+            pass
+
+    def _count_jsonl(self, file_path: Path) -> int:
+        """Count the records in a JSONL file without parsing them."""
+        return sum(1 for _ in self._iter_jsonl_raw(file_path))
+
     def save_conversation(self, session_id: str, conversation_data: Dict):
         """Save a completed conversation."""
         record = {
@@ -101,6 +122,18 @@ class DataManager:
         """Get all saved evaluations."""
         return self._read_jsonl(self.evaluations_file)
 
+    def count_conversations(self) -> int:
+        """Number of saved conversations."""
+        return self._count_jsonl(self.conversations_file)
+
+    def iter_raw_conversations(self) -> Iterator[bytes]:
+        """Stream saved conversations as raw JSON records (for export)."""
+        return self._iter_jsonl_raw(self.conversations_file)
+
+    def iter_raw_evaluations(self) -> Iterator[bytes]:
+        """Stream saved evaluations as raw JSON records (for export)."""
+        return self._iter_jsonl_raw(self.evaluations_file)
+
     def get_system_metrics(self) -> Dict:
         """Get current system metrics."""
         return self._load_json(self.system_metrics_file)
@@ -116,18 +149,15 @@ class DataManager:
     def compute_system_readiness(self) -> Dict[str, Any]:
         """Compute overall system readiness score and metrics."""
         evaluations = self.get_all_evaluations()
-        conversations = self.get_all_conversations()
+        conversation_count = self.count_conversations()
 
         # Get vector store size
         vector_size = 0
         try:
-            import json
-            from pathlib import Path
-
             vector_file = Path("siva_data/conversation_vectors.json")
             if vector_file.exists():
-                with open(vector_file, "r") as f:
-                    data = json.load(f)
+                with open(vector_file, "rb") as f:
+                    data = orjson.loads(f.read())
                     vector_size = len(data.get("conversations", []))
         except:
             vector_size = 0
@@ -160,7 +190,7 @@ class DataManager:
         coverage_ready = route_coverage >= 80.0
 
         # 4. Stability Readiness (10% weight) - system uptime and consistency
-        stability_score = min(100, len(conversations) * 2)  # Simple stability metric
+        stability_score = min(100, conversation_count * 2)  # Simple stability metric
         stability_ready = stability_score >= 60.0
 
         # Overall readiness score (weighted average)
@@ -200,7 +230,7 @@ class DataManager:
                 "stability_readiness": {
                     "score": round(stability_score, 1),
                     "ready": stability_ready,
-                    "conversations": len(conversations),
+                    "conversations": conversation_count,
                     "threshold": 60.0,
                 },
             },
@@ -215,13 +245,10 @@ class DataManager:
             return 0.0
 
         try:
-            import json
-            from pathlib import Path
-
             vector_file = Path("siva_data/conversation_vectors.json")
             if vector_file.exists():
-                with open(vector_file, "r") as f:
-                    data = json.load(f)
+                with open(vector_file, "rb") as f:
+                    data = orjson.loads(f.read())
                     conversations = data.get("conversations", [])
 
                 # Count routes
@@ -322,7 +349,7 @@ class DataManager:
     def compute_learning_curve(self) -> Dict[str, List]:
         """Compute learning curve from historical data including vector store growth."""
         evaluations = self.get_all_evaluations()
-        conversations = self.get_all_conversations()
+        conversation_count = self.count_conversations()
 
         timestamps = []
         accuracy_scores = []
@@ -330,7 +357,7 @@ class DataManager:
         cumulative_correct = 0
 
         # If we have no evaluations, create some baseline data points
-        if not evaluations and not conversations:
+        if not evaluations and not conversation_count:
             # Return empty data with proper structure
             return {
                 "timestamps": [],
@@ -344,13 +371,10 @@ class DataManager:
         total_vector_conversations = 0
         try:
             # Try to import and get current vector store size
-            import json
-            from pathlib import Path
-
             vector_file = Path("siva_data/conversation_vectors.json")
             if vector_file.exists():
-                with open(vector_file, "r") as f:
-                    data = json.load(f)
+                with open(vector_file, "rb") as f:
+                    data = orjson.loads(f.read())
                     total_vector_conversations = len(data.get("conversations", []))
         except:
             total_vector_conversations = 0
@@ -371,9 +395,9 @@ class DataManager:
                 if timestamp:
                     try:
                         # Convert ISO timestamp to display format
-                        from datetime import datetime
-
-                        dt = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+                        dt = datetime.datetime.fromisoformat(
+                            timestamp.replace("Z", "+00:00")
+                        )
                         formatted_timestamp = dt.strftime("%m/%d %H:%M")
                     except:
                         formatted_timestamp = timestamp[:10]  # Just date part
@@ -388,12 +412,9 @@ class DataManager:
         elif total_vector_conversations > 0:
             # Get vector conversations to show actual learning progression
             try:
-                import json
-                from pathlib import Path
-
                 vector_file = Path("siva_data/conversation_vectors.json")
-                with open(vector_file, "r") as f:
-                    data = json.load(f)
+                with open(vector_file, "rb") as f:
+                    data = orjson.loads(f.read())
                     vector_conversations = data.get("conversations", [])
 
                 # Sort by timestamp and show progression
@@ -408,9 +429,7 @@ class DataManager:
                     timestamp = conv.get("timestamp", "")
                     if timestamp:
                         try:
-                            from datetime import datetime
-
-                            dt = datetime.fromisoformat(
+                            dt = datetime.datetime.fromisoformat(
                                 timestamp.replace("Z", "+00:00")
                             )
                             formatted_timestamp = dt.strftime("%m/%d %H:%M")
@@ -497,8 +516,8 @@ class DataManager:
         unnecessary = len(evaluations) - necessary
         precision = necessary / len(evaluations) if evaluations else 0
 
-        conversations = self.get_all_conversations()
-        total_conversations = len(conversations)
+        conversation_count = self.count_conversations()
+        total_conversations = conversation_count
         escalation_rate = len(evaluations) / max(1, total_conversations)
 
         return {
@@ -535,11 +554,11 @@ class DataManager:
 
         # Reinitialize
         self._initialize_files()
-        print("[DataManager] All data reset")
+        logger.info("All data reset")
 
     def get_data_statistics(self) -> Dict[str, Any]:
         """Get comprehensive statistics about stored data."""
-        conversations = self.get_all_conversations()
+        conversation_count = self.count_conversations()
         evaluations = self.get_all_evaluations()
         metrics = self.get_system_metrics()
 
@@ -571,7 +590,7 @@ class DataManager:
             )
 
         return {
-            "total_conversations": len(conversations),
+            "total_conversations": conversation_count,
             "total_evaluations": len(evaluations),
             "route_distribution": route_counts,
             "recent_activity": recent_activity,
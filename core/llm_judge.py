@@ -1,85 +1,325 @@
 """LLM Judge for data curation and evaluation of routing decisions."""
 
-import json
-from typing import List, Dict, Any, Optional
+import hashlib
+import httpx
+import logging
+import orjson
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 import os
+import requests
+
+logger = logging.getLogger("siva.llm_judge")
+
+# The summary is capped at ~100 words, so only the most recent ~400 tokens of
+# patient input are worth sending.
+MAX_SUMMARY_INPUT_CHARS = 1600
+
+# Confirmed predictions on these routes add little signal to the retriever
+LOW_SIGNAL_ROUTES = frozenset({"routine"})
+
+# Keep connections to the OpenAI API warm across judge calls
+HTTP_LIMITS = httpx.Limits(
+    max_connections=20, max_keepalive_connections=20, keepalive_expiry=60.0
+)
+
+# How long cached judge outputs stay valid (seconds)
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Local model output longer than this is treated as a failed summary
+MAX_LOCAL_SUMMARY_WORDS = 150
+
+# Keywords for the offline symptom fallback, matched in one case-insensitive pass;
+# the lookahead keeps overlapping hits (e.g. "ache" inside "headache")
+SYMPTOM_KEYWORDS = (
+    "pain",
+    "ache",
+    "fever",
+    "headache",
+    "chest",
+    "shortness",
+    "breath",
+    "dizzy",
+    "nausea",
+    "vomiting",
+    "rash",
+    "swelling",
+    "cough",
+)
+SYMPTOM_KEYWORDS_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, SYMPTOM_KEYWORDS)) + "))", re.IGNORECASE
+)
+
+SYMPTOMS_SUMMARY_PROMPT = """Extract and summarize the key medical symptoms and reasons for visit from this patient conversation:
+
+Conversation: {conversation_text}
+
+Provide a concise summary focusing on:
+- Primary symptoms
+- Severity indicators
+- Duration
+- Associated symptoms
+
+Keep it under 100 words and focus on medical relevance."""
+
+ANALYSIS_PROMPT = """Analyze this medical routing decision:
+
+Agent predicted: {agent_prediction}
+Human expert said: {human_label}
+
+Patient conversation summary: {symptoms_summary}
+
+Provide a brief analysis (1-2 sentences) of:
+1. Whether the prediction was reasonable given the symptoms
+2. What the agent might have missed or misunderstood
+
+Be concise and focus on learning opportunities."""
+
+SUMMARY_AND_ANALYSIS_PROMPT = """Review this medical routing decision.
+
+Agent predicted: {agent_prediction}
+Human expert said: {human_label}
+
+Patient conversation: {conversation_text}
+
+Respond with a JSON object with exactly these fields:
+- "summary": the key medical symptoms and reasons for visit (primary symptoms, severity indicators, duration, associated symptoms), under 100 words
+- "analysis": 1-2 sentences on whether the prediction was reasonable given the symptoms and what the agent might have missed or misunderstood
+
+Be concise and focus on medical relevance and learning opportunities."""
 
 
 class LLMJudge:
     """Handles evaluation and curation of routing decisions."""
 
-    def __init__(self, openai_api_key: Optional[str] = None):
-        self.client = OpenAI(api_key=openai_api_key or os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        local_model: Optional[str] = None,
+        local_model_url: str = "http://localhost:11434",
+        cache_path: Optional[str] = None,
+        cache_ttl: int = DEFAULT_CACHE_TTL,
+    ):
+        self.client = OpenAI(
+            api_key=openai_api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=30.0),
+        )
+
+        # Optional on-disk cache of judge outputs, keyed by prompt, so re-runs
+        # over the same conversations skip the LLM entirely
+        self.cache_ttl = cache_ttl
+        self._cache_lock = threading.Lock()
+        self._cache = self._open_cache(cache_path) if cache_path else None
+
+        # Optional small local model (served by Ollama) for symptom summaries
+        self.local_model = local_model
+        self.local_model_url = local_model_url.rstrip("/")
+        self.local_session = requests.Session()
 
     def extract_symptoms_summary(self, conversation_messages: List[Dict]) -> str:
         """Extract and summarize key symptoms from conversation for training data."""
+        conversation_text = self._get_patient_text(conversation_messages)
 
-        # Find user messages about symptoms and visit reasons
-        user_inputs = []
-        for msg in conversation_messages:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_inputs.append(content)
-
-        conversation_text = " ".join(user_inputs)
-
-        prompt = f"""
-        Extract and summarize the key medical symptoms and reasons for visit from this patient conversation:
-        
-        Conversation: {conversation_text}
-        
-        Provide a concise summary focusing on:
-        - Primary symptoms
-        - Severity indicators  
-        - Duration
-        - Associated symptoms
-        
-        Keep it under 100 words and focus on medical relevance.
-        """
+        prompt = SYMPTOMS_SUMMARY_PROMPT.format(
+            conversation_text=conversation_text[-MAX_SUMMARY_INPUT_CHARS:]
+        )
+
+        cached = self._cache_get(prompt)
+        if cached is not None:
+            return cached
+
+        if self.local_model:
+            summary = self._generate_local_summary(prompt)
+            if summary:
+                logger.debug("Generated local symptoms summary: %.50s...", summary)
+                self._cache_put(prompt, summary)
+                return summary
 
         try:
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
+                max_tokens=120,
                 temperature=0.1,
+                response_format={"type": "text"},
             )
 
             summary = response.choices[0].message.content.strip()
-            print(f"[LLMJudge] Generated symptoms summary: {summary[:50]}...")
+            logger.debug("Generated symptoms summary: %.50s...", summary)
+            self._cache_put(prompt, summary)
             return summary
 
         except Exception as e:
-            print(f"[LLMJudge] Error generating symptoms summary: {e}")
+            logger.error("Error generating symptoms summary: %s", e)
             # Fallback to basic extraction
             return self._basic_symptom_extraction(conversation_text)
 
+    def _generate_local_summary(self, prompt: str) -> Optional[str]:
+        """Generate a summary with the local model, or None if it is unusable."""
+        try:
+            response = self.local_session.post(
+                f"{self.local_model_url}/api/generate",
+                data=orjson.dumps(
+                    {
+                        "model": self.local_model,
+                        "prompt": prompt,
+                        "stream": False,
+                        "options": {"temperature": 0.1, "num_predict": 120},
+                    }
+                ),
+                timeout=10,
+            )
+            response.raise_for_status()
+            summary = orjson.loads(response.content).get("response", "").strip()
+        except Exception as e:
+            logger.warning("Local model unavailable, falling back to OpenAI: %s", e)
+            return None
+
+        if not summary or len(summary.split()) > MAX_LOCAL_SUMMARY_WORDS:
+            logger.warning("Local summary failed sanity check, falling back to OpenAI")
+            return None
+        return summary
+
+    def summarize_and_analyze(
+        self, conversation_messages: List[Dict], agent_prediction: str, human_label: str
+    ) -> Dict[str, str]:
+        """Summarize symptoms and analyze a routing decision in a single LLM call."""
+        conversation_text = self._get_patient_text(conversation_messages)
+
+        prompt = SUMMARY_AND_ANALYSIS_PROMPT.format(
+            agent_prediction=agent_prediction,
+            human_label=human_label,
+            conversation_text=conversation_text[-MAX_SUMMARY_INPUT_CHARS:],
+        )
+
+        cached = self._cache_get(prompt)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=250,
+                temperature=0.1,
+                response_format={"type": "json_object"},
+            )
+
+            result = orjson.loads(response.choices[0].message.content)
+            summary = str(result["summary"]).strip()
+            analysis = str(result["analysis"]).strip()
+            logger.debug("Generated summary and analysis: %.50s...", summary)
+
+        except Exception as e:
+            logger.error("Error generating summary and analysis: %s", e)
+            summary = self._basic_symptom_extraction(conversation_text)
+            analysis = self._basic_analysis(agent_prediction, human_label)
+            return {"summary": summary, "analysis": analysis}
+
+        judgement = {"summary": summary, "analysis": analysis}
+        self._cache_put(prompt, orjson.dumps(judgement).decode())
+        return judgement
+
+    def _open_cache(self, cache_path: str) -> Optional[sqlite3.Connection]:
+        """Open the on-disk judge cache and drop entries older than the TTL."""
+        try:
+            conn = sqlite3.connect(cache_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS judge_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, ts INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "DELETE FROM judge_cache WHERE ts < ?",
+                (int(time.time()) - self.cache_ttl,),
+            )
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.warning("Could not open cache at %s: %s", cache_path, e)
+            return None
+
+    def _cache_get(self, prompt: str) -> Optional[str]:
+        """Look up a cached output for this exact prompt."""
+        if self._cache is None:
+            return None
+        key = hashlib.sha256(prompt.encode()).hexdigest()
+        with self._cache_lock:
+            # Re-checked under the lock: close() may have run since
+            if self._cache is None:
+                return None
+            try:
+                row = self._cache.execute(
+                    "SELECT value FROM judge_cache WHERE key = ? AND ts >= ?",
+                    (key, int(time.time()) - self.cache_ttl),
+                ).fetchone()
+            except sqlite3.Error as e:
+                # A locked or damaged cache is just a miss
+                logger.warning("Cache read failed: %s", e)
+                return None
+        if row:
+            logger.debug("Cache hit")
+            return row[0]
+        return None
+
+    def _cache_put(self, prompt: str, value: str):
+        """Store an LLM output for this exact prompt."""
+        if self._cache is None:
+            return
+        key = hashlib.sha256(prompt.encode()).hexdigest()
+        with self._cache_lock:
+            if self._cache is None:
+                return
+            try:
+                self._cache.execute(
+                    "INSERT OR REPLACE INTO judge_cache (key, value, ts) "
+                    "VALUES (?, ?, ?)",
+                    (key, value, int(time.time())),
+                )
+                self._cache.commit()
+            except sqlite3.Error as e:
+                # The output is still returned to the caller; only caching is lost
+                logger.warning("Cache write failed: %s", e)
+
+    def close(self):
+        """Close the HTTP clients and the cache connection (app shutdown).
+
+        The connection is closed under the cache lock, so a write still running in
+        a worker thread finishes first and later ones become no-ops.
+        """
+        self.client.close()
+        self.local_session.close()
+        if self._cache is not None:
+            with self._cache_lock:
+                self._cache.close()
+                self._cache = None
+
+    def _get_patient_text(self, conversation_messages: List[Dict]) -> str:
+        """Join the patient's messages, which carry the symptoms and visit reasons."""
+        return " ".join(
+            msg.get("content", "")
+            for msg in conversation_messages
+            if msg.get("role") == "user"
+        )
+
+    def _basic_analysis(self, agent_prediction: str, human_label: str) -> str:
+        """Fallback analysis when the LLM is unavailable."""
+        is_correct = agent_prediction.lower() == human_label.lower()
+        return f"Prediction {'correct' if is_correct else 'incorrect'}: {agent_prediction} vs {human_label}"
+
     def _basic_symptom_extraction(self, conversation_text: str) -> str:
         """Fallback method for symptom extraction."""
         # Simple keyword-based extraction
-        keywords = [
-            "pain",
-            "ache",
-            "fever",
-            "headache",
-            "chest",
-            "shortness",
-            "breath",
-            "dizzy",
-            "nausea",
-            "vomiting",
-            "rash",
-            "swelling",
-            "cough",
-        ]
-
-        found_symptoms = []
-        text_lower = conversation_text.lower()
-
-        for keyword in keywords:
-            if keyword in text_lower:
-                found_symptoms.append(keyword)
+        matched = {
+            match.group(1).lower()
+            for match in SYMPTOM_KEYWORDS_RE.finditer(conversation_text)
+        }
+        found_symptoms = [keyword for keyword in SYMPTOM_KEYWORDS if keyword in matched]
 
         if found_symptoms:
             return f"Patient reports: {', '.join(found_symptoms[:5])}"
@@ -90,119 +330,195 @@ class LLMJudge:
                 else conversation_text
             )
 
-    def create_training_example(
+    def process_feedback(
         self, conversation_messages: List[Dict], agent_prediction: str, human_label: str
-    ) -> Dict[str, Any]:
-        """Create a structured training example from conversation and human feedback."""
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Evaluate human feedback and build a training example if warranted.
 
-        symptoms_summary = self.extract_symptoms_summary(conversation_messages)
+        The training gate only needs the labels, so it runs before any LLM work;
+        rejected cases skip the summary and keep a label-only analysis.
+        """
+        evaluation = self.evaluate_prediction_accuracy(
+            agent_prediction,
+            human_label,
+            conversation_messages,
+            analysis=self._basic_analysis(agent_prediction, human_label),
+        )
+        if not self.should_add_to_training(evaluation):
+            return evaluation, None
+
+        judgement = self.summarize_and_analyze(
+            conversation_messages, agent_prediction, human_label
+        )
+        evaluation["analysis"] = judgement["analysis"]
+        training_example = self.create_training_example(
+            evaluation, conversation_messages, symptoms_summary=judgement["summary"]
+        )
+        return evaluation, training_example
+
+    def create_training_example(
+        self,
+        evaluation: Dict[str, Any],
+        conversation_messages: List[Dict],
+        symptoms_summary: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Create a structured training example from conversation and human feedback.
+
+        Returns None without summarizing if the evaluation should not be used
+        for training.
+        """
+        agent_prediction = evaluation["agent_prediction"]
+        human_label = evaluation["human_label"]
+
+        if not self.should_add_to_training(evaluation):
+            logger.debug(
+                "Skipped training example: %s vs %s", agent_prediction, human_label
+            )
+            return None
+
+        if symptoms_summary is None:
+            symptoms_summary = self.extract_symptoms_summary(conversation_messages)
 
         training_example = {
             "conversation_messages": conversation_messages,
             "symptoms_summary": symptoms_summary,
             "agent_prediction": agent_prediction,
             "correct_route": human_label,
-            "prediction_correct": agent_prediction.lower() == human_label.lower(),
+            "prediction_correct": evaluation["prediction_correct"],
         }
 
-        print(
-            f"[LLMJudge] Created training example: {agent_prediction} vs {human_label}"
-        )
+        logger.info("Created training example: %s vs %s", agent_prediction, human_label)
         return training_example
 
     def evaluate_prediction_accuracy(
-        self, agent_prediction: str, human_label: str, conversation_messages: List[Dict]
+        self,
+        agent_prediction: str,
+        human_label: str,
+        conversation_messages: List[Dict],
+        symptoms_summary: Optional[str] = None,
+        analysis: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Evaluate the accuracy of an agent's routing prediction."""
-
-        is_correct = agent_prediction.lower() == human_label.lower()
+        """Evaluate the accuracy of an agent's routing prediction.
 
-        # Get detailed analysis from LLM
-        analysis_prompt = f"""
-        Analyze this medical routing decision:
-        
-        Agent predicted: {agent_prediction}
-        Human expert said: {human_label}
-        
-        Patient conversation summary: {self.extract_symptoms_summary(conversation_messages)}
-        
-        Provide a brief analysis (1-2 sentences) of:
-        1. Whether the prediction was reasonable given the symptoms
-        2. What the agent might have missed or misunderstood
-        
-        Be concise and focus on learning opportunities.
+        Pass ``analysis`` (e.g. from ``summarize_and_analyze``) to skip the LLM
+        call entirely, or ``symptoms_summary`` to skip the summary call.
         """
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": analysis_prompt}],
-                max_tokens=100,
-                temperature=0.3,
-            )
-
-            analysis = response.choices[0].message.content.strip()
-
-        except Exception as e:
-            print(f"[LLMJudge] Error generating analysis: {e}")
-            analysis = f"Prediction {'correct' if is_correct else 'incorrect'}: {agent_prediction} vs {human_label}"
+        is_correct = agent_prediction.lower() == human_label.lower()
 
-        import datetime
+        if analysis is None:
+            analysis = self._generate_analysis(
+                agent_prediction, human_label, conversation_messages, symptoms_summary
+            )
 
         evaluation = {
             "prediction_correct": is_correct,
             "agent_prediction": agent_prediction,
             "human_label": human_label,
             "analysis": analysis,
-            "timestamp": datetime.datetime.now().isoformat(),
+            "timestamp": datetime.now().isoformat(),
         }
 
-        print(
-            f"[LLMJudge] Evaluation: {'✓' if is_correct else '✗'} {agent_prediction} vs {human_label}"
+        logger.info(
+            "Evaluation: %s %s vs %s",
+            "✓" if is_correct else "✗",
+            agent_prediction,
+            human_label,
         )
         return evaluation
 
+    def _generate_analysis(
+        self,
+        agent_prediction: str,
+        human_label: str,
+        conversation_messages: List[Dict],
+        symptoms_summary: Optional[str] = None,
+    ) -> str:
+        """Get a short LLM analysis of a routing decision."""
+        if symptoms_summary is None:
+            symptoms_summary = self.extract_symptoms_summary(conversation_messages)
+
+        analysis_prompt = ANALYSIS_PROMPT.format(
+            agent_prediction=agent_prediction,
+            human_label=human_label,
+            symptoms_summary=symptoms_summary,
+        )
+
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": analysis_prompt}],
+                max_tokens=100,
+                temperature=0.3,
+            )
+
+            return response.choices[0].message.content.strip()
+
+        except Exception as e:
+            logger.error("Error generating analysis: %s", e)
+            return self._basic_analysis(agent_prediction, human_label)
+
     def analyze_system_performance(
         self, evaluations: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """Analyze overall system performance from multiple evaluations."""
 
-        if not evaluations:
+        # Count correct predictions and errors by route type in one pass
+        correct_predictions = 0
+        route_errors = Counter()
+        for ev in evaluations:
+            if ev.get("prediction_correct", False):
+                correct_predictions += 1
+            elif "prediction_correct" in ev:  # Focus on errors
+                route_errors[self.route_error_key(ev)] += 1
+
+        return self.summarize_performance(
+            len(evaluations), correct_predictions, route_errors
+        )
+
+    @staticmethod
+    def route_error_key(evaluation: Dict[str, Any]) -> str:
+        """Label for a misrouted case, e.g. "routine → urgent"."""
+        human_route = evaluation.get("human_label", "unknown")
+        agent_route = evaluation.get("agent_prediction", "unknown")
+        return f"{agent_route} → {human_route}"
+
+    def summarize_performance(
+        self, total_cases: int, correct_predictions: int, route_errors: Counter
+    ) -> Dict[str, Any]:
+        """Performance summary from running counts of evaluations."""
+        if not total_cases:
             return {"total_cases": 0, "accuracy": 0.0}
 
-        total_cases = len(evaluations)
-        correct_predictions = sum(
-            1 for eval in evaluations if eval.get("prediction_correct", False)
-        )
         accuracy = correct_predictions / total_cases
 
-        # Count errors by route type
-        route_errors = {}
-        for eval in evaluations:
-            if not eval.get("prediction_correct", True):  # Focus on errors
-                human_route = eval.get("human_label", "unknown")
-                agent_route = eval.get("agent_prediction", "unknown")
-                error_key = f"{agent_route} → {human_route}"
-                route_errors[error_key] = route_errors.get(error_key, 0) + 1
-
         performance_summary = {
             "total_cases": total_cases,
             "correct_predictions": correct_predictions,
             "accuracy": accuracy,
-            "common_errors": dict(
-                sorted(route_errors.items(), key=lambda x: x[1], reverse=True)[:3]
-            ),
+            "common_errors": dict(route_errors.most_common(3)),
         }
 
-        print(
-            f"[LLMJudge] System performance: {accuracy:.2%} accuracy ({correct_predictions}/{total_cases})"
+        logger.debug(
+            "System performance: %.2f%% accuracy (%d/%d)",
+            accuracy * 100,
+            correct_predictions,
+            total_cases,
         )
         return performance_summary
 
     def should_add_to_training(self, evaluation: Dict[str, Any]) -> bool:
-        """Determine if this case should be added to training data."""
-        # For now, add all cases where we have human feedback
-        # Could be made more sophisticated (e.g., only add challenging cases)
+        """Determine if this case should be added to training data.
+
+        Only the label fields of ``evaluation`` are used, so this is cheap to
+        call before any LLM work is done for the case.
+        """
+        # Skip confirmed predictions on low-signal routes; keep everything else
+        if (
+            evaluation.get("prediction_correct", False)
+            and evaluation.get("human_label") in LOW_SIGNAL_ROUTES
+        ):
+            return False
         return True
 
     def generate_improvement_suggestions(
@@ -1,12 +1,296 @@
 """Enhanced UnifiedProcessor with routing and escalation capabilities."""
 
-import json
-from typing import Dict, List, Any, Optional, Tuple
-from openai import OpenAI
+import asyncio
+import logging
+import os
+import re
+import httpx
+import orjson
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+try:
+    from openai import DefaultAioHttpClient
+except ImportError:  # openai releases without the aiohttp transport
+    DefaultAioHttpClient = None
 
 from .vector_store import VectorStore
 from .llm_judge import LLMJudge
-from .schemas import FUNCTION_SCHEMAS
+from .schemas import TOOLS
+
+logger = logging.getLogger("siva.processor")
+
+# Model used for the intake conversation (Responses API)
+INTAKE_MODEL = "gpt-4o-mini"
+
+# Tool schemas are already plain JSON, so they are sent through extra_body and skip
+# the SDK's per-request TypedDict transform (several ms per call for these schemas)
+TOOLS_BODY = {"tools": TOOLS}
+
+# Upper bound on concurrent OpenAI requests from this process; excess calls wait
+# here instead of tripping rate limits and stacking up client-side retries
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONC", "32"))
+openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+# Keep idle API connections warm between turns; the SDK's default 5 s expiry is
+# shorter than most patient replies, so turns kept paying a fresh TLS handshake.
+# Both transports honour these (aiohttp maps them onto its TCPConnector).
+OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+    keepalive_expiry=60.0,
+)
+
+# Fail fast on connect so the SDK's jittered retries (max_retries=2) take over;
+# the read timeout applies per streamed chunk, not to the whole reply
+OPENAI_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def create_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Build the shared AsyncOpenAI client, on aiohttp when openai[aiohttp] is installed."""
+    http_client = None
+    if DefaultAioHttpClient is not None:
+        try:
+            # aiohttp speaks HTTP/1.1 only, so the pool settings carry the load
+            http_client = DefaultAioHttpClient(
+                limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_TIMEOUT
+            )
+        except RuntimeError:
+            # The aiohttp extra is missing; use the httpx transport
+            pass
+    if http_client is None:
+        http_client = DefaultAsyncHttpxClient(
+            http2=True, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_TIMEOUT
+        )
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=OPENAI_TIMEOUT)
+
+
+# Basic intake tools: function name -> (session data key, argument name). Every
+# field must hold an answer before moving on from basic intake
+BASIC_INFO_FIELDS = {
+    "verify_fullname": ("full_name", "names"),
+    "verify_birthday": ("birthday", "birthday"),
+    "list_prescriptions": ("prescriptions", "prescriptions"),
+    "list_allergies": ("allergies", "allergies"),
+    "list_conditions": ("conditions", "conditions"),
+    "list_visit_reasons": ("visit_reasons", "visit_reasons"),
+}
+BASIC_INFO_KEYS = tuple(key for key, _ in BASIC_INFO_FIELDS.values())
+
+# Text turns (user/assistant messages) carried into the fresh response chain that
+# each intake phase transition starts
+PHASE_CONTEXT_MESSAGES = 6
+
+# Transcript messages a response chain may span before a user turn compacts it
+# into a fresh seed the same way, so long phases don't grow the model's context
+MAX_CHAIN_MESSAGES = 30
+
+# Static preamble shared by every session (~1.1k tokens, above OpenAI's 1024-token
+# prompt-cache minimum). It always sits at messages[0] and must stay byte-identical
+# across requests so the cached prefix can be reused; per-session state belongs in
+# session["data"], never in this string.
+SYSTEM_PROMPT = """You are part of the Tsidi Health Services intake system.
+
+ORGANIZATION
+Tsidi Health Services runs primary care clinics, urgent care centers and a 24/7 \
+nurse line. Before a patient sees a clinician, an intake agent collects their \
+details and routes the case to the appropriate level of care. Physicians may also \
+run the system in a silent observer mode during consultations. The instructions \
+below apply to every conversation; the phase-specific instructions that follow \
+them tell you what to do right now.
+
+GENERAL RULES
+1. You are not a medical professional. Never diagnose, never recommend or change \
+medication, and never tell a patient that a symptom is harmless.
+2. Never assume, infer or invent information. Only record what the user actually \
+says. If an answer is ambiguous, incomplete or contradicts an earlier answer, ask \
+a short clarifying question before recording it.
+3. Keep responses short, warm and professional. Ask one question at a time and \
+avoid medical jargon unless the user uses it first.
+4. Address the user by their first name once you know it.
+5. Do not read back the full record to the user unless they ask for it.
+6. If the user describes signs of an emergency (crushing chest pain, trouble \
+breathing, signs of stroke such as facial droop or slurred speech, severe \
+bleeding, loss of consciousness, thoughts of self-harm), tell them immediately \
+to call emergency services and continue the intake only if they are safe.
+7. Treat everything the user tells you as confidential. Never mention other \
+patients or the cases used as references.
+
+FUNCTION CALLING RULES
+Store each piece of information with a function call as soon as it is provided. \
+Call a function again if the user corrects an earlier answer.
+- verify_fullname: the user's first and last name.
+- verify_birthday: the date of birth in YYYY-MM-DD format. Confirm the year if \
+the user gives only a day and month.
+- list_prescriptions: every current medication with its dosage. Use an empty \
+list if the user takes none.
+- list_allergies: drug, food and environmental allergies. Use an empty list if \
+the user has none.
+- list_conditions: ongoing or chronic medical conditions. Use an empty list if \
+the user has none.
+- list_visit_reasons: the reasons for today's visit in the user's own words.
+- collect_detailed_symptoms: for each symptom, its severity on a 1-10 scale, \
+how long it has been present, associated symptoms and anything that makes it \
+better or worse.
+- determine_routing: the care route and a one or two sentence justification.
+
+REQUIRED BASIC INFORMATION
+Full name, birthday, prescriptions, allergies, medical conditions and reason for \
+visit. "None" is a valid answer for prescriptions, allergies and conditions.
+
+CARE ROUTES
+- emergency: life-threatening presentations such as severe chest pain, stroke \
+signs, difficulty breathing, anaphylaxis or major trauma.
+- urgent: serious but not life-threatening problems that need same-day care, \
+such as high fever, severe pain, suspected fractures or dehydration.
+- routine: ongoing or non-urgent problems, mild symptoms and follow-ups that can \
+wait for a regular appointment.
+- self_care: minor issues that usually resolve at home, such as a common cold \
+or a mild headache.
+- information: questions about medication, prevention, vaccines or test results \
+that do not require an examination.
+
+PHYSICIAN CONSULTATION MODE
+When a physician runs the system during a consultation you are a silent clinical \
+observer. Never address the patient or the physician directly. Produce concise \
+notes for the physician's screen: the patient's presentation, relevant history, \
+possible differential diagnoses, potential medication interactions with the \
+recorded prescriptions and allergies, and evidence-based considerations. Mark \
+anything uncertain as uncertain, and never present a suggestion as a decision. \
+The physician's judgement always takes precedence over your notes.
+
+EXAMPLE EXCHANGES
+User: "My name's Maria Lopez."
+Assistant: calls verify_fullname with first_name "Maria", last_name "Lopez", \
+then asks for her date of birth.
+
+User: "I was born on March 3rd."
+Assistant: "Thanks, Maria. Could you also tell me the year you were born?"
+
+User: "I don't take any medications."
+Assistant: calls list_prescriptions with an empty list, then asks about \
+allergies.
+
+User: "I've had a headache for three days, it's about a 6 out of 10 and gets \
+worse with bright light."
+Assistant: calls collect_detailed_symptoms with symptom "headache", severity 6, \
+duration "3 days", triggers "bright light", then asks whether there are any \
+other symptoms such as nausea, fever or a stiff neck.
+
+User: "Can I take ibuprofen for this?"
+Assistant: "I'm not able to give medical advice, but I'll make sure the doctor \
+sees your question."
+"""
+
+
+# Fixed phase instructions appended after SYSTEM_PROMPT; the routing prompt is
+# built from ROUTING_PROMPT_TEMPLATE with the few-shot examples of similar cases
+PHYSICIAN_CONSULTATION_PROMPTS = {
+    "recording": (
+        "You are a Clinical Observer, silently recording a physician-patient conversation. "
+        "Your role is to provide real-time clinical decision support without interrupting the conversation. "
+        "DO NOT SPEAK OR RESPOND VERBALLY. Only provide silent analysis and suggestions. "
+        "Focus on: symptom analysis, differential diagnosis, medication interactions, and evidence-based recommendations. "
+        "Extract clinical insights and display them on screen for the physician's reference. "
+        "Your responses should be internal analysis only - never spoken to the patient or physician."
+    ),
+    "extraction": (
+        "You are extracting clinical insights from the recorded conversation. "
+        "Identify: patient presentation, physician decision, clinical reasoning, and key factors. "
+        "Structure the information clearly for physician review and learning."
+    ),
+    "validation": (
+        "You are presenting the extracted clinical insights for physician validation. "
+        "Format the information clearly and request approval or modifications."
+    ),
+}
+PATIENT_INTAKE_PROMPTS = {
+    "basic_intake": (
+        "You are John, an agent for Tsidi Health Services. "
+        "Your job is to collect basic information from the user before their doctor visit. "
+        "Address the user by their first name, be polite and professional. "
+        "You're not a medical professional, so you shouldn't provide any advice. Keep your responses short. "
+        "IMPORTANT: Start by greeting the user warmly and introducing yourself. "
+        "Collect basic information: full name, birthday, prescriptions, allergies, medical conditions, and reason for visit. "
+        "Ask for clarification if a user response is ambiguous. "
+        "NEVER assume or hallucinate information. Only store what the user actually provides. "
+        "Use function calls to store each piece of information as you collect it. "
+        "Once ALL basic information is collected, tell the user you need to ask some detailed questions about their symptoms."
+    ),
+    "detailed_symptoms": (
+        "You are John, continuing the intake process. "
+        "Now collect DETAILED information about the patient's symptoms. "
+        "For each symptom, ask about: severity (1-10 scale), duration, associated symptoms, and triggers. "
+        "Be thorough but efficient. Use the collect_detailed_symptoms function to store this information. "
+        "After collecting detailed symptoms, proceed to determine the appropriate care route."
+    ),
+}
+ROUTING_PROMPT_TEMPLATE = """You are John, making a routing decision based on patient information.
+                
+Here are similar cases for reference:
+{examples}
+
+Based on the patient's symptoms and these examples, determine the appropriate care route:
+- emergency: Life-threatening (severe chest pain, stroke signs, difficulty breathing)
+- urgent: Serious but not life-threatening (high fever, severe pain)  
+- routine: Ongoing or non-urgent (mild symptoms, follow-ups)
+- self_care: Minor issues (cold, mild headache)
+- information: Questions about medication or prevention
+
+Use the determine_routing function to make your decision."""
+ROUTING_PROMPT_NO_EXAMPLES = (
+    "You are John, making a routing decision. "
+    "Based on the patient's symptoms, determine appropriate care route. "
+    "Use the determine_routing function, but note this will likely be escalated "
+    "since we have limited similar cases for reference."
+)
+
+
+# Mocked literature evidence (OpenEvidence API stand-in) per visit-reason category
+DOMAIN_EVIDENCE = {
+    "chest_pain": (
+        "Chest pain evaluation guidelines: Immediate assessment for cardiac causes",
+        "Risk stratification for chest pain: Consider age, risk factors, and presentation",
+        "Atypical chest pain patterns require comprehensive cardiac workup",
+    ),
+    "headache": (
+        "Headache classification: Primary vs secondary headache evaluation",
+        "Red flag symptoms for headache: Sudden onset, fever, neurological deficits",
+        "Migraine vs tension headache: Clinical differentiation guidelines",
+    ),
+    "fever": (
+        "Fever evaluation in adults: Focus on duration and associated symptoms",
+        "Infectious vs non-infectious fever: Diagnostic approach",
+        "Fever with rash: Consider viral exanthems and drug reactions",
+    ),
+    "dyspnea": (
+        "Dyspnea evaluation: Cardiac vs pulmonary vs systemic causes",
+        "Acute dyspnea: Immediate assessment for life-threatening conditions",
+        "Chronic dyspnea: Systematic approach to diagnosis",
+    ),
+    "abdominal_pain": (
+        "Acute abdominal pain: Surgical vs medical causes",
+        "Abdominal pain localization: Organ-specific differential diagnosis",
+        "Chronic abdominal pain: Functional vs organic causes",
+    ),
+}
+GENERAL_EVIDENCE = (
+    "Patient history and medication review essential for accurate diagnosis",
+    "New symptoms in patients with chronic conditions require thorough evaluation",
+    "Drug interactions and side effects common in patients on multiple medications",
+)
+# A visit reason mentioning several categories counts as the first in this order
+EVIDENCE_PRIORITY = list(DOMAIN_EVIDENCE)
+# Visit-reason keywords and their category, matched in one pass per reason
+EVIDENCE_KEYWORDS = {
+    "chest pain": "chest_pain",
+    "headache": "headache",
+    "fever": "fever",
+    "shortness of breath": "dyspnea",
+    "breathing": "dyspnea",
+    "abdominal pain": "abdominal_pain",
+}
+EVIDENCE_KEYWORD_RE = re.compile("|".join(map(re.escape, EVIDENCE_KEYWORDS)))
 
 
 class UnifiedProcessor:
@@ -17,7 +301,7 @@ class UnifiedProcessor:
         session: Dict[str, Any],
         vector_store: VectorStore,
         llm_judge: LLMJudge,
-        openai_client: OpenAI,
+        openai_client: AsyncOpenAI,
         retrieval_threshold: int = 3,
         current_mode: str = "patient_intake",
     ):
@@ -26,6 +310,10 @@ class UnifiedProcessor:
         self.llm_judge = llm_judge
         self.client = openai_client
         self.retrieval_threshold = retrieval_threshold
+        # (transcript length, vector store version) and the cases retrieved for it
+        self._similar_memo: Optional[Tuple[Tuple[int, int], list]] = None
+        # (messages scanned, lowercased user text or None before the first one)
+        self._user_text_memo: Tuple[int, Optional[str]] = (0, None)
 
         # Initialize session with mode and phase tracking
         if "mode" not in self.session:
@@ -43,7 +331,8 @@ class UnifiedProcessor:
 
         if "messages" not in self.session:
             self.session["messages"] = [
-                {"role": "system", "content": self._get_system_prompt()}
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": self._get_system_prompt()},
             ]
         if "data" not in self.session:
             self.session["data"] = {}
@@ -62,75 +351,18 @@ class UnifiedProcessor:
 
     def _get_physician_consultation_prompt(self, phase: str) -> str:
         """Get system prompt for physician consultation mode."""
-        if phase == "recording":
-            return (
-                "You are a Clinical Observer, silently recording a physician-patient conversation. "
-                "Your role is to provide real-time clinical decision support without interrupting the conversation. "
-                "DO NOT SPEAK OR RESPOND VERBALLY. Only provide silent analysis and suggestions. "
-                "Focus on: symptom analysis, differential diagnosis, medication interactions, and evidence-based recommendations. "
-                "Extract clinical insights and display them on screen for the physician's reference. "
-                "Your responses should be internal analysis only - never spoken to the patient or physician."
-            )
-        elif phase == "extraction":
-            return (
-                "You are extracting clinical insights from the recorded conversation. "
-                "Identify: patient presentation, physician decision, clinical reasoning, and key factors. "
-                "Structure the information clearly for physician review and learning."
-            )
-        else:  # validation
-            return (
-                "You are presenting the extracted clinical insights for physician validation. "
-                "Format the information clearly and request approval or modifications."
-            )
+        return PHYSICIAN_CONSULTATION_PROMPTS.get(
+            phase, PHYSICIAN_CONSULTATION_PROMPTS["validation"]
+        )
 
     def _get_patient_intake_prompt(self, phase: str) -> str:
         """Get system prompt for patient intake mode."""
-        if phase == "basic_intake":
-            return (
-                "You are John, an agent for Tsidi Health Services. "
-                "Your job is to collect basic information from the user before their doctor visit. "
-                "Address the user by their first name, be polite and professional. "
-                "You're not a medical professional, so you shouldn't provide any advice. Keep your responses short. "
-                "IMPORTANT: Start by greeting the user warmly and introducing yourself. "
-                "Collect basic information: full name, birthday, prescriptions, allergies, medical conditions, and reason for visit. "
-                "Ask for clarification if a user response is ambiguous. "
-                "NEVER assume or hallucinate information. Only store what the user actually provides. "
-                "Use function calls to store each piece of information as you collect it. "
-                "Once ALL basic information is collected, tell the user you need to ask some detailed questions about their symptoms."
-            )
-        elif phase == "detailed_symptoms":
-            return (
-                "You are John, continuing the intake process. "
-                "Now collect DETAILED information about the patient's symptoms. "
-                "For each symptom, ask about: severity (1-10 scale), duration, associated symptoms, and triggers. "
-                "Be thorough but efficient. Use the collect_detailed_symptoms function to store this information. "
-                "After collecting detailed symptoms, proceed to determine the appropriate care route."
-            )
-        elif phase == "routing":
-            similar_cases = self.vector_store.retrieve_similar(self.session["messages"])
-            examples = self.vector_store.get_few_shot_examples(similar_cases)
-
+        if phase == "routing":
+            examples = self.vector_store.get_few_shot_examples(self._similar_cases())
             if examples:
-                return f"""You are John, making a routing decision based on patient information.
-                
-Here are similar cases for reference:
-{examples}
-
-Based on the patient's symptoms and these examples, determine the appropriate care route:
-- emergency: Life-threatening (severe chest pain, stroke signs, difficulty breathing)
-- urgent: Serious but not life-threatening (high fever, severe pain)  
-- routine: Ongoing or non-urgent (mild symptoms, follow-ups)
-- self_care: Minor issues (cold, mild headache)
-- information: Questions about medication or prevention
-
-Use the determine_routing function to make your decision."""
-            else:
-                return (
-                    "You are John, making a routing decision. "
-                    "Based on the patient's symptoms, determine appropriate care route. "
-                    "Use the determine_routing function, but note this will likely be escalated "
-                    "since we have limited similar cases for reference."
-                )
+                return ROUTING_PROMPT_TEMPLATE.format(examples=examples)
+            return ROUTING_PROMPT_NO_EXAMPLES
+        return PATIENT_INTAKE_PROMPTS.get(phase)
 
     def handle_function_call(self, function_call):
         """Handle function calls and store data."""
@@ -138,18 +370,9 @@ Use the determine_routing function to make your decision."""
         arguments = function_call.get("arguments", {})
 
         # Store basic intake data
-        if name == "verify_fullname":
-            self.session["data"]["full_name"] = arguments.get("names")
-        elif name == "verify_birthday":
-            self.session["data"]["birthday"] = arguments.get("birthday")
-        elif name == "list_prescriptions":
-            self.session["data"]["prescriptions"] = arguments.get("prescriptions")
-        elif name == "list_allergies":
-            self.session["data"]["allergies"] = arguments.get("allergies")
-        elif name == "list_conditions":
-            self.session["data"]["conditions"] = arguments.get("conditions")
-        elif name == "list_visit_reasons":
-            self.session["data"]["visit_reasons"] = arguments.get("visit_reasons")
+        if name in BASIC_INFO_FIELDS:
+            key, argument = BASIC_INFO_FIELDS[name]
+            self.session["data"][key] = arguments.get(argument)
 
         # Store detailed symptoms
         elif name == "collect_detailed_symptoms":
@@ -163,27 +386,16 @@ Use the determine_routing function to make your decision."""
             }
 
     def all_basic_info_collected(self) -> bool:
-        """Check if all basic intake info is collected."""
-        data = self.session.get("data", {})
-        required = [
-            "full_name",
-            "birthday",
-            "prescriptions",
-            "allergies",
-            "conditions",
-            "visit_reasons",
-        ]
+        """Check if all basic intake info is collected.
 
-        for key in required:
-            if key not in data:
-                return False
-            value = data[key]
-            if isinstance(value, list):
-                continue  # Accept empty lists
-            elif isinstance(value, str):
-                if not value.strip():
-                    return False
-            elif value is None:
+        Read from session["data"], which the tau2 tools and restored sessions fill
+        too, so there is no separate flag to keep in step.
+        """
+        data = self.session.get("data", {})
+        for key in BASIC_INFO_KEYS:
+            value = data.get(key)
+            # Empty lists are valid answers ("no allergies"); blank strings are not
+            if value is None or (isinstance(value, str) and not value.strip()):
                 return False
         return True
 
@@ -195,11 +407,28 @@ Use the determine_routing function to make your decision."""
         """Check if routing decision is made."""
         return "routing" in self.session.get("data", {})
 
+    def _similar_cases(self) -> List[Tuple[Dict, float]]:
+        """Retrieve cases similar to the transcript, reusing the last lookup.
+
+        The routing prompt, the escalation check and the evidence panel all ask
+        for the same cases. Messages are only ever appended, so the transcript
+        length and the store version identify when a fresh lookup is needed.
+        """
+        key = (len(self.session["messages"]), self.vector_store.version)
+        memo = self._similar_memo
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        similar_cases = self.vector_store.retrieve_similar(self.session["messages"])
+        self._similar_memo = (key, similar_cases)
+        return similar_cases
+
     def should_escalate(self) -> bool:
         """Determine if case should be escalated based on retrieval threshold."""
-        similar_count = self.vector_store.count_similar_cases(self.session["messages"])
-        print(
-            f"[UnifiedProcessor] Found {similar_count} similar cases, threshold: {self.retrieval_threshold}"
+        similar_count = len(self._similar_cases())
+        logger.debug(
+            "Found %d similar cases, threshold: %d",
+            similar_count,
+            self.retrieval_threshold,
         )
         return similar_count < self.retrieval_threshold
 
@@ -226,78 +455,231 @@ Use the determine_routing function to make your decision."""
 
         return combined_confidence
 
-    def next_prompt(
-        self, user_message: Optional[str] = None
+    async def next_prompt(
+        self,
+        user_message: Optional[str] = None,
+        on_text_delta: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> tuple[str, bool, Optional[Dict]]:
         """
         Process next step in conversation.
         Returns: (reply, end_call, escalation_info)
-        """
-        print(f"=== IntakeProcessor.next_prompt ===")
-        print(f"Phase: {self.session.get('phase')}")
-        print(f"User message: '{user_message}'")
-        print(f"Current data: {self.session.get('data', {})}")
-
-        if user_message:
-            self.session["messages"].append({"role": "user", "content": user_message})
-
-        # Call OpenAI with function calling
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo-1106",
-            messages=self.session["messages"],
-            functions=FUNCTION_SCHEMAS,
-            function_call="auto",
-            max_tokens=300,
-            temperature=0.3,
-        )
-
-        message = response.choices[0].message
-        print(f"LLM response: {message.content}")
-        print(f"Function call: {message.function_call}")
-
-        self.session["messages"].append(message.model_dump(exclude_unset=True))
-
-        # Handle function calls
-        if message.function_call:
-            function_call = message.function_call.model_dump()
-            arguments = json.loads(function_call["arguments"])
-            function_call["arguments"] = arguments
-            self.handle_function_call(function_call)
 
-            # Add function response
-            self.session["messages"].append(
-                {"role": "function", "name": function_call["name"], "content": "OK"}
+        If on_text_delta is given the model output is streamed and each text delta
+        is awaited through it as it arrives (used to pipeline replies into TTS).
+        """
+        while True:
+            logger.debug(
+                "next_prompt phase=%s user_message=%r data=%s",
+                self.session.get("phase"),
+                user_message,
+                self.session.get("data", {}),
             )
 
-            # Check for phase transitions
-            if (
-                self.session["phase"] == "basic_intake"
-                and self.all_basic_info_collected()
-            ):
-                self.session["phase"] = "detailed_symptoms"
-                self.session["messages"].append(
-                    {"role": "system", "content": self._get_system_prompt()}
-                )
-            elif (
-                self.session["phase"] == "detailed_symptoms"
-                and self.has_detailed_symptoms()
-            ):
-                self.session["phase"] = "routing"
-                self.session["messages"].append(
-                    {"role": "system", "content": self._get_system_prompt()}
+            if user_message:
+                messages = self.session["messages"]
+                chain_length = len(messages) - self.session.get("chain_start", 0)
+                if chain_length >= MAX_CHAIN_MESSAGES and not self.session.get(
+                    "context_seed"
+                ):
+                    self._seed_context(self._current_phase_prompt())
+                messages.append({"role": "user", "content": user_message})
+
+            # The server keeps the conversation state, so only upload the messages
+            # added since the last stored response
+            cursor = self.session.get("response_cursor", 0)
+            input_items = self._to_response_input(self.session["messages"][cursor:])
+            # After a phase transition the new chain starts from a compacted seed
+            seed = self.session.get("context_seed")
+            if seed:
+                input_items = seed + input_items
+            response = await self._create_response(input_items, on_text_delta)
+
+            # output_text re-walks response.output on every access, so read it once
+            reply = response.output_text
+            tool_calls = [
+                item for item in response.output if item.type == "function_call"
+            ]
+            if logger.isEnabledFor(logging.DEBUG):
+                details = getattr(response.usage, "input_tokens_details", None)
+                logger.debug(
+                    "Input tokens: %s (cached: %s) response=%r tool_calls=%s",
+                    getattr(response.usage, "input_tokens", 0),
+                    getattr(details, "cached_tokens", 0) or 0,
+                    reply,
+                    [tool_call.name for tool_call in tool_calls],
                 )
-            elif self.session["phase"] == "routing" and self.has_routing_decision():
-                # Check if we should escalate
-                if self.should_escalate():
-                    return self._prepare_escalation()
-                else:
-                    return self._finalize_routing()
 
-            # Continue conversation
-            return self.next_prompt(None)
+            # Keep the local transcript in chat format for retrieval, judging and
+            # escalation, which all read session["messages"]
+            assistant_message = {"role": "assistant", "content": reply}
+            if tool_calls:
+                assistant_message["tool_calls"] = [
+                    {
+                        "id": tool_call.call_id,
+                        "type": "function",
+                        "function": {
+                            "name": tool_call.name,
+                            "arguments": tool_call.arguments,
+                        },
+                    }
+                    for tool_call in tool_calls
+                ]
+            self.session["messages"].append(assistant_message)
+            self.session["last_response_id"] = response.id
+            self.session.pop("context_seed", None)
+            self.session["response_cursor"] = len(self.session["messages"])
+
+            # Handle tool calls; every call_id needs a matching tool output
+            if tool_calls:
+                for tool_call in tool_calls:
+                    self.handle_function_call(
+                        {
+                            "name": tool_call.name,
+                            "arguments": orjson.loads(tool_call.arguments),
+                        }
+                    )
+                    self.session["messages"].append(
+                        {
+                            "role": "tool",
+                            "tool_call_id": tool_call.call_id,
+                            "content": "OK",
+                        }
+                    )
+
+                # Check for phase transitions
+                if (
+                    self.session["phase"] == "basic_intake"
+                    and self.all_basic_info_collected()
+                ):
+                    self.session["phase"] = "detailed_symptoms"
+                    self._start_phase_context(self._get_system_prompt())
+                elif (
+                    self.session["phase"] == "detailed_symptoms"
+                    and self.has_detailed_symptoms()
+                ):
+                    self.session["phase"] = "routing"
+                    # The routing prompt retrieves similar cases, which embeds the
+                    # transcript with a blocking request; keep it off the event loop
+                    self._start_phase_context(
+                        await asyncio.to_thread(self._get_system_prompt)
+                    )
+                elif self.session["phase"] == "routing" and self.has_routing_decision():
+                    # Check if we should escalate (also a vector store lookup)
+                    if await asyncio.to_thread(self.should_escalate):
+                        return self._prepare_escalation()
+                    else:
+                        return self._finalize_routing()
+
+                # Continue conversation with the tool outputs
+                user_message = None
+                continue
+
+            # No tool call - regular response
+            return reply, False, None
+
+    def _start_phase_context(self, phase_prompt: str):
+        """Append the new phase prompt and start a fresh server-side response chain.
+
+        The stored chain would keep every earlier phase prompt and tool call in the
+        model's context. The next request instead drops previous_response_id and
+        sends the static prefix, the phase prompt, the data collected so far and the
+        last few text turns. session["messages"] keeps the full transcript.
+        """
+        self.session["messages"].append({"role": "system", "content": phase_prompt})
+        self._seed_context(phase_prompt)
+
+    def _current_phase_prompt(self) -> str:
+        """Return the latest phase prompt recorded in the transcript."""
+        for message in reversed(self.session["messages"]):
+            if message["role"] == "system":
+                return message["content"]
+        return self._get_system_prompt()
+
+    def _seed_context(self, phase_prompt: str):
+        """Start a fresh response chain seeded with the phase prompt and recent turns."""
+        messages = self.session["messages"]
+        recent = []
+        for message in reversed(messages):
+            if message["role"] in ("user", "assistant") and message.get("content"):
+                recent.append({"role": message["role"], "content": message["content"]})
+                if len(recent) == PHASE_CONTEXT_MESSAGES:
+                    break
+        recent.reverse()
+
+        collected = orjson.dumps(self.session["data"]).decode()
+        self.session["context_seed"] = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": phase_prompt},
+            {"role": "system", "content": f"Information collected so far: {collected}"},
+            *recent,
+        ]
+        # Tool outputs of the old chain are not sent; the seed replaces them
+        self.session["last_response_id"] = None
+        self.session["response_cursor"] = len(messages)
+        self.session["chain_start"] = len(messages)
 
-        # No function call - regular response
-        return message.content, False, None
+    async def _create_response(
+        self,
+        input_items: List[Dict[str, Any]],
+        on_text_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+    ):
+        """Create the next model response, streaming text deltas if requested."""
+        request = dict(
+            model=INTAKE_MODEL,
+            input=input_items,
+            previous_response_id=self.session.get("last_response_id"),
+            store=True,
+            tool_choice="auto",
+            max_output_tokens=300,
+            temperature=0.3,
+            # Past the context window, drop middle turns instead of failing
+            truncation="auto",
+            extra_body=TOOLS_BODY,
+        )
+        if on_text_delta is None:
+            async with openai_semaphore:
+                return await self.client.responses.create(**request)
+
+        response = None
+        # A streamed response holds its slot until the stream is drained
+        async with openai_semaphore:
+            stream = await self.client.responses.create(stream=True, **request)
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    await on_text_delta(event.delta)
+                elif event.type == "response.completed":
+                    response = event.response
+        if response is None:
+            raise RuntimeError("Response stream ended without a completed response")
+        return response
+
+    @staticmethod
+    def _to_response_input(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convert chat-format transcript messages into Responses API input items."""
+        items = []
+        for message in messages:
+            role = message.get("role")
+            if role == "tool":
+                items.append(
+                    {
+                        "type": "function_call_output",
+                        "call_id": message["tool_call_id"],
+                        "output": message.get("content", ""),
+                    }
+                )
+                continue
+            if message.get("content"):
+                items.append({"role": role, "content": message["content"]})
+            for tool_call in message.get("tool_calls") or []:
+                items.append(
+                    {
+                        "type": "function_call",
+                        "call_id": tool_call["id"],
+                        "name": tool_call["function"]["name"],
+                        "arguments": tool_call["function"]["arguments"],
+                    }
+                )
+        return items
 
     def _prepare_escalation(self) -> tuple[str, bool, Dict]:
         """Prepare escalation data for human review."""
@@ -375,7 +757,7 @@ Use the determine_routing function to make your decision."""
             }
 
         # Get similar cases from vector store
-        similar_cases = self.vector_store.retrieve_similar(self.session["messages"])
+        similar_cases = self._similar_cases()
 
         # Get domain evidence (medical literature)
         domain_evidence = self._get_domain_evidence()
@@ -407,7 +789,7 @@ Use the determine_routing function to make your decision."""
     def _get_physician_consultation_evidence(self) -> Dict[str, Any]:
         """Get evidence for physician consultation mode."""
         # Get similar clinical cases
-        similar_cases = self.vector_store.retrieve_similar(self.session["messages"])
+        similar_cases = self._similar_cases()
 
         # Get domain evidence (medical literature)
         domain_evidence = self._get_domain_evidence()
@@ -435,85 +817,51 @@ Use the determine_routing function to make your decision."""
             },
         }
 
+    def _user_text(self) -> str:
+        """Lowercased text of the user's messages, extended as messages arrive.
+
+        Only messages added since the last call are scanned; the transcript is
+        append-only, so the earlier text never changes.
+        """
+        messages = self.session.get("messages", [])
+        scanned, text = self._user_text_memo
+        # /evidence calls this from a worker thread while a turn may be appending,
+        # so record exactly the messages that were scanned
+        end = len(messages)
+        for message in messages[scanned:end]:
+            if message.get("role") == "user":
+                content = (message.get("content") or "").lower()
+                text = content if text is None else f"{text} {content}"
+        self._user_text_memo = (end, text)
+        return text or ""
+
     def _get_domain_evidence(self) -> Dict[str, Any]:
         """Get domain evidence from medical literature (mocked OpenEvidence API)."""
         try:
             # Extract key terms from conversation for literature search
-            conversation_text = " ".join(
-                [
-                    msg.get("content", "")
-                    for msg in self.session.get("messages", [])
-                    if msg.get("role") == "user"
-                ]
-            ).lower()
+            conversation_text = self._user_text()
 
             # Extract patient data for more targeted literature search
             patient_data = self.session.get("data", {})
             visit_reasons = patient_data.get("visit_reasons", [])
 
-            # Mock OpenEvidence API response based on conversation content and visit reasons
-            evidence_items = []
-
-            # Check visit reasons first for initial recommendations
-            if visit_reasons:
-                for reason in visit_reasons:
-                    reason_lower = reason.lower()
-
-                    if "chest pain" in reason_lower:
-                        evidence_items.extend(
-                            [
-                                "Chest pain evaluation guidelines: Immediate assessment for cardiac causes",
-                                "Risk stratification for chest pain: Consider age, risk factors, and presentation",
-                                "Atypical chest pain patterns require comprehensive cardiac workup",
-                            ]
-                        )
-
-                    elif "headache" in reason_lower:
-                        evidence_items.extend(
-                            [
-                                "Headache classification: Primary vs secondary headache evaluation",
-                                "Red flag symptoms for headache: Sudden onset, fever, neurological deficits",
-                                "Migraine vs tension headache: Clinical differentiation guidelines",
-                            ]
-                        )
-
-                    elif "fever" in reason_lower:
-                        evidence_items.extend(
-                            [
-                                "Fever evaluation in adults: Focus on duration and associated symptoms",
-                                "Infectious vs non-infectious fever: Diagnostic approach",
-                                "Fever with rash: Consider viral exanthems and drug reactions",
-                            ]
-                        )
-
-                    elif (
-                        "shortness of breath" in reason_lower
-                        or "breathing" in reason_lower
-                    ):
-                        evidence_items.extend(
-                            [
-                                "Dyspnea evaluation: Cardiac vs pulmonary vs systemic causes",
-                                "Acute dyspnea: Immediate assessment for life-threatening conditions",
-                                "Chronic dyspnea: Systematic approach to diagnosis",
-                            ]
-                        )
-
-                    elif "abdominal pain" in reason_lower:
-                        evidence_items.extend(
-                            [
-                                "Acute abdominal pain: Surgical vs medical causes",
-                                "Abdominal pain localization: Organ-specific differential diagnosis",
-                                "Chronic abdominal pain: Functional vs organic causes",
-                            ]
-                        )
-
-            # Add general evidence if no specific conditions found
-            if not evidence_items:
-                evidence_items = [
-                    "Patient history and medication review essential for accurate diagnosis",
-                    "New symptoms in patients with chronic conditions require thorough evaluation",
-                    "Drug interactions and side effects common in patients on multiple medications",
-                ]
+            # Mock OpenEvidence API response based on the visit reasons; each reason
+            # contributes its highest-priority category, each category only once
+            categories = []
+            for reason in visit_reasons or []:
+                matches = EVIDENCE_KEYWORD_RE.findall(reason.lower())
+                if matches:
+                    category = min(
+                        (EVIDENCE_KEYWORDS[match] for match in matches),
+                        key=EVIDENCE_PRIORITY.index,
+                    )
+                    if category not in categories:
+                        categories.append(category)
+
+            # Fall back to general evidence if no specific conditions found
+            evidence_items = [
+                item for category in categories for item in DOMAIN_EVIDENCE[category]
+            ] or list(GENERAL_EVIDENCE)
 
             return {
                 "evidence": evidence_items,
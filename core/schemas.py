@@ -191,3 +191,7 @@ FUNCTION_SCHEMAS = [
         },
     },
 ]
+
+# Tool definitions for the Responses API `tools=` argument, built once at import so
+# every request sends the same (cacheable) schema prefix
+TOOLS = tuple({"type": "function", **schema} for schema in FUNCTION_SCHEMAS)
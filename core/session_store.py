@@ -0,0 +1,125 @@
+"""Bounded in-memory session storage with LRU eviction and idle expiry."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class SessionStore(MutableMapping):
+    """Dict-like session map that evicts idle and least-recently-used sessions.
+
+    A session expires ttl seconds after it was last read or written, and once more
+    than maxsize sessions are held the least recently used ones are dropped.
+    Bulk reads (values/items/iteration) do not count as activity. Sessions marked
+    with finish() are dropped after their grace period even if still being read.
+    Sessions marked with pin() are exempt from both bounds until finish() or del.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Finished sessions and their eviction deadlines, in deadline order
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        # Pinned sessions, held outside the TTL/LRU order
+        self._pinned: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _expire(self):
+        """Drop expired sessions (oldest activity sits at the front)."""
+        now = time.monotonic()
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+            self._finished.pop(key, None)
+        while self._finished:
+            key, deadline = next(iter(self._finished.items()))
+            if deadline > now:
+                break
+            del self._finished[key]
+            self._data.pop(key, None)
+
+    def _evict_lru(self):
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._finished.pop(evicted, None)
+
+    def pin(self, key: str):
+        """Keep a session regardless of idle time or size until finish() is called."""
+        with self._lock:
+            self._expire()
+            if key in self._data:
+                _, self._pinned[key] = self._data.pop(key)
+                self._finished.pop(key, None)
+
+    def finish(self, key: str, grace: float):
+        """Evict a session grace seconds from now, regardless of further activity."""
+        with self._lock:
+            if key in self._pinned:
+                value = self._pinned.pop(key)
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._evict_lru()
+            if key in self._data and key not in self._finished:
+                self._finished[key] = time.monotonic() + grace
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            if key in self._pinned:
+                return self._pinned[key]
+            self._expire()
+            _, value = self._data[key]
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            if key in self._pinned:
+                self._pinned[key] = value
+                return
+            self._expire()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            self._finished.pop(key, None)
+            self._evict_lru()
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if self._pinned.pop(key, None) is not None:
+                return
+            del self._data[key]
+            self._finished.pop(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._expire()
+            return iter([*self._pinned, *self._data])
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._pinned) + len(self._data)
+
+    def values(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._expire()
+            return [*self._pinned.values()] + [
+                value for _, value in self._data.values()
+            ]
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            self._expire()
+            return [*self._pinned.items()] + [
+                (key, value) for key, (_, value) in self._data.items()
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._finished.clear()
+            self._pinned.clear()
@@ -1,13 +1,29 @@
 """Vector store for conversation retrieval and similarity matching."""
 
+import logging
 import os
-import json
+import threading
+import httpx
+import orjson
 import numpy as np
+from collections import OrderedDict
 from typing import List, Dict, Any, Tuple, Optional
 from openai import OpenAI
 from datetime import datetime
 from pathlib import Path
-from sklearn.metrics.pairwise import cosine_similarity
+
+logger = logging.getLogger("siva.vector_store")
+
+# Embeddings and retrieval results kept per conversation text; the routing prompt,
+# the escalation check and the evidence panel all look up the same conversation
+EMBEDDING_CACHE_SIZE = 256
+
+# Embedding requests sit on the routing path of each turn; keep their connections
+# warm between turns and fail fast on connect so the SDK's retries take over
+HTTP_LIMITS = httpx.Limits(
+    max_connections=20, max_keepalive_connections=20, keepalive_expiry=60.0
+)
+EMBEDDING_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
 
 
 class VectorStore:
@@ -23,37 +39,69 @@ class VectorStore:
         self.data_dir.mkdir(exist_ok=True)
         self.data_file = self.data_dir / "conversation_vectors.json"
         self.similarity_threshold = similarity_threshold
-        self.client = OpenAI(api_key=openai_api_key or os.getenv("OPENAI_API_KEY"))
+        self.client = OpenAI(
+            api_key=openai_api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.Client(
+                http2=True, limits=HTTP_LIMITS, timeout=EMBEDDING_TIMEOUT
+            ),
+        )
         self.conversations = []
+        # Dashboard rows for each stored case, kept in step with self.conversations
+        self.projected_conversations: List[Dict[str, Any]] = []
+        # Bumped whenever the stored cases change; invalidates cached retrievals
+        self.version = 0
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._similar_cache: "OrderedDict[Tuple[str, int], Tuple[int, list]]" = (
+            OrderedDict()
+        )
+        self._cache_lock = threading.Lock()
+        # Stored cases with embeddings and their unit-length embedding matrix,
+        # rebuilt when self.version moves on
+        self._matrix: Tuple[List[Dict[str, Any]], Optional[np.ndarray]] = ([], None)
+        self._matrix_version = -1
         self.load_data()
 
     def load_data(self):
         """Load existing conversation data from file."""
         try:
             if self.data_file.exists():
-                with open(self.data_file, "r") as f:
-                    data = json.load(f)
-                    self.conversations = data.get("conversations", [])
-                print(
-                    f"[VectorStore] Loaded {len(self.conversations)} conversations from {self.data_file}"
+                data = orjson.loads(self.data_file.read_bytes())
+                self.conversations = data.get("conversations", [])
+                self.projected_conversations = [
+                    self._project(conv) for conv in self.conversations
+                ]
+                logger.info(
+                    "Loaded %d conversations from %s",
+                    len(self.conversations),
+                    self.data_file,
                 )
             else:
-                print(f"[VectorStore] No existing data file found at {self.data_file}")
+                logger.info("No existing data file found at %s", self.data_file)
         except Exception as e:
-            print(f"[VectorStore] Error loading data: {e}")
+            logger.error("Error loading data: %s", e)
             self.conversations = []
+            self.projected_conversations = []
+
+    @staticmethod
+    def _project(conv: Dict[str, Any]) -> Dict[str, Any]:
+        """Dashboard view of a stored case (no messages or embedding)."""
+        return {
+            "id": conv.get("id"),
+            "symptoms_summary": conv.get("symptoms_summary", ""),
+            "correct_route": conv.get("correct_route", "unknown"),
+            "timestamp": conv.get("timestamp", ""),
+        }
 
     def save_data(self):
         """Save conversation data to file."""
         try:
             data = {"conversations": self.conversations}
-            with open(self.data_file, "w") as f:
-                json.dump(data, f, indent=2)
-            print(
-                f"[VectorStore] Saved {len(self.conversations)} conversations to {self.data_file}"
+            self.data_file.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            logger.debug(
+                "Saved %d conversations to %s", len(self.conversations), self.data_file
             )
         except Exception as e:
-            print(f"[VectorStore] Error saving data: {e}")
+            logger.error("Error saving data: %s", e)
 
     def get_conversation_text(self, conversation_messages: List[Dict]) -> str:
         """Extract relevant text from conversation for embedding."""
@@ -69,17 +117,56 @@ class VectorStore:
 
         return " ".join(relevant_parts)
 
+    def _cache_embedding(self, text: str, embedding: List[float]):
+        with self._cache_lock:
+            self._embedding_cache[text] = embedding
+            self._embedding_cache.move_to_end(text)
+            if len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+
     def get_embedding(self, text: str) -> List[float]:
-        """Get OpenAI embedding for text."""
+        """Get OpenAI embedding for text (memoized per text)."""
+        with self._cache_lock:
+            embedding = self._embedding_cache.get(text)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(text)
+                return embedding
+
         try:
             response = self.client.embeddings.create(
                 model="text-embedding-3-small", input=text
             )
-            return response.data[0].embedding
+            embedding = response.data[0].embedding
         except Exception as e:
-            print(f"[VectorStore] Error getting embedding: {e}")
+            logger.error("Error getting embedding: %s", e)
             return []
 
+        self._cache_embedding(text, embedding)
+        return embedding
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Get OpenAI embeddings for several texts with a single request."""
+        embeddings = {}
+        with self._cache_lock:
+            for text in texts:
+                if text in self._embedding_cache:
+                    embeddings[text] = self._embedding_cache[text]
+
+        missing = [text for text in dict.fromkeys(texts) if text not in embeddings]
+        if missing:
+            try:
+                response = self.client.embeddings.create(
+                    model="text-embedding-3-small", input=missing
+                )
+            except Exception as e:
+                logger.error("Error getting embeddings: %s", e)
+            else:
+                for item in response.data:
+                    embeddings[missing[item.index]] = item.embedding
+                    self._cache_embedding(missing[item.index], item.embedding)
+
+        return [embeddings.get(text, []) for text in texts]
+
     def add_labeled_case(
         self,
         conversation_messages: List[Dict],
@@ -88,81 +175,174 @@ class VectorStore:
         session_id: str = None,
     ):
         """Add a human-verified conversation to the vector store."""
-        conversation_text = self.get_conversation_text(conversation_messages)
-
-        if not conversation_text.strip():
-            print("[VectorStore] Empty conversation text, skipping")
-            return
-
-        # Check for duplicates if session_id is provided
-        if session_id:
-            for existing_conv in self.conversations:
-                if existing_conv.get("session_id") == session_id:
-                    print(
-                        f"[VectorStore] Conversation for session {session_id} already exists, skipping"
+        self.add_labeled_cases(
+            [
+                {
+                    "conversation_messages": conversation_messages,
+                    "correct_route": correct_route,
+                    "symptoms_summary": symptoms_summary,
+                    "session_id": session_id,
+                }
+            ]
+        )
+
+    def add_labeled_cases(self, cases: List[Dict[str, Any]]):
+        """Add several human-verified conversations, embedding them in one request.
+
+        Each case holds the add_labeled_case arguments as a dict.
+        """
+        self.add_embedded_cases(self.embed_labeled_cases(cases))
+
+    def embed_labeled_cases(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Build store entries for new cases, embedding them in one request.
+
+        Does not modify the store, so callers serializing writes can run the
+        embedding request outside their lock and pass the result to
+        add_embedded_cases().
+        """
+        pending = []
+        known_sessions = {conv.get("session_id") for conv in self.conversations}
+        for case in cases:
+            conversation_text = self.get_conversation_text(
+                case["conversation_messages"]
+            )
+            if not conversation_text.strip():
+                logger.debug("Empty conversation text, skipping")
+                continue
+
+            # Check for duplicates if session_id is provided
+            session_id = case.get("session_id")
+            if session_id:
+                if session_id in known_sessions:
+                    logger.debug(
+                        "Conversation for session %s already exists, skipping",
+                        session_id,
                     )
-                    return
-
-        embedding = self.get_embedding(conversation_text)
-        if not embedding:
-            print("[VectorStore] Failed to get embedding, skipping")
-            return
-
-        conversation_entry = {
-            "id": len(self.conversations),
-            "conversation_text": conversation_text,
-            "symptoms_summary": symptoms_summary or conversation_text[:200],
-            "correct_route": correct_route,
-            "embedding": embedding,
-            "messages": conversation_messages,
-            "timestamp": datetime.now().isoformat(),
-            "session_id": session_id,
-        }
+                    continue
+                known_sessions.add(session_id)
 
-        self.conversations.append(conversation_entry)
-        self.save_data()
-        print(
-            f"[VectorStore] Added labeled case: {correct_route} (session: {session_id})"
-        )
+            pending.append((case, conversation_text))
+
+        if not pending:
+            return []
+
+        embeddings = self.get_embeddings([text for _, text in pending])
+        entries = []
+        for (case, conversation_text), embedding in zip(pending, embeddings):
+            if not embedding:
+                logger.warning("Failed to get embedding, skipping")
+                continue
+
+            entries.append(
+                {
+                    "conversation_text": conversation_text,
+                    "symptoms_summary": case.get("symptoms_summary")
+                    or conversation_text[:200],
+                    "correct_route": case["correct_route"],
+                    "embedding": embedding,
+                    "messages": case["conversation_messages"],
+                    "timestamp": datetime.now().isoformat(),
+                    "session_id": case.get("session_id"),
+                }
+            )
+        return entries
+
+    def add_embedded_cases(self, entries: List[Dict[str, Any]]):
+        """Store entries from embed_labeled_cases() and save the store."""
+        known_sessions = {conv.get("session_id") for conv in self.conversations}
+        added = 0
+        for entry in entries:
+            # Another writer may have stored the session since it was embedded
+            session_id = entry.get("session_id")
+            if session_id:
+                if session_id in known_sessions:
+                    continue
+                known_sessions.add(session_id)
+
+            conversation_entry = {"id": len(self.conversations), **entry}
+            self.conversations.append(conversation_entry)
+            self.projected_conversations.append(self._project(conversation_entry))
+            added += 1
+            logger.info(
+                "Added labeled case: %s (session: %s)",
+                entry["correct_route"],
+                session_id,
+            )
+
+        if added:
+            self.version += 1
+            self.save_data()
 
     def retrieve_similar(
         self, current_conversation: List[Dict], k: int = 5
     ) -> List[Tuple[Dict, float]]:
         """Retrieve similar conversations with similarity scores."""
         if not self.conversations:
-            print("[VectorStore] No conversations in store")
+            logger.debug("No conversations in store")
             return []
 
         current_text = self.get_conversation_text(current_conversation)
         if not current_text.strip():
-            print("[VectorStore] Empty current conversation")
+            logger.debug("Empty current conversation")
             return []
 
+        key = (current_text, k)
+        with self._cache_lock:
+            # Results are stamped with the version seen here; cases added while
+            # this lookup runs then invalidate them instead of being missed
+            version = self.version
+            cached = self._similar_cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._similar_cache.move_to_end(key)
+                return list(cached[1])
+
         current_embedding = self.get_embedding(current_text)
         if not current_embedding:
-            print("[VectorStore] Failed to get current embedding")
+            logger.warning("Failed to get current embedding")
             return []
 
-        similarities = []
-        for conv in self.conversations:
-            if conv.get("embedding"):
-                sim_score = cosine_similarity([current_embedding], [conv["embedding"]])[
-                    0
-                ][0]
-                similarities.append((conv, sim_score))
-
-        # Sort by similarity (highest first) and filter by threshold
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        similar_cases = [
-            (conv, score)
-            for conv, score in similarities
-            if score >= self.similarity_threshold
-        ]
-
-        print(
-            f"[VectorStore] Found {len(similar_cases)} similar cases above threshold {self.similarity_threshold}"
+        # Cosine similarity against every stored case in one matrix-vector product
+        rows, matrix = self._embedding_matrix()
+        similar_cases = []
+        if matrix is not None:
+            query = np.asarray(current_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = matrix @ (query / norm if norm else query)
+            # Highest similarity first, keeping those above the threshold
+            for i in np.argsort(-scores, kind="stable"):
+                if scores[i] < self.similarity_threshold:
+                    break
+                similar_cases.append((rows[i], float(scores[i])))
+
+        logger.debug(
+            "Found %d similar cases above threshold %s",
+            len(similar_cases),
+            self.similarity_threshold,
         )
-        return similar_cases[:k]
+        similar_cases = similar_cases[:k]
+        with self._cache_lock:
+            self._similar_cache[key] = (version, similar_cases)
+            self._similar_cache.move_to_end(key)
+            if len(self._similar_cache) > EMBEDDING_CACHE_SIZE:
+                self._similar_cache.popitem(last=False)
+        return list(similar_cases)
+
+    def _embedding_matrix(self) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """Return the stored cases with embeddings and their normalized rows."""
+        with self._cache_lock:
+            if self._matrix_version != self.version:
+                rows = [conv for conv in self.conversations if conv.get("embedding")]
+                matrix = None
+                if rows:
+                    matrix = np.asarray(
+                        [conv["embedding"] for conv in rows], dtype=np.float32
+                    )
+                    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                    norms[norms == 0] = 1.0
+                    matrix /= norms
+                self._matrix = (rows, matrix)
+                self._matrix_version = self.version
+            return self._matrix
 
     def get_few_shot_examples(self, similar_cases: List[Tuple[Dict, float]]) -> str:
         """Format retrieved cases for LLM few-shot prompting."""
@@ -183,6 +363,17 @@ class VectorStore:
         similar_cases = self.retrieve_similar(current_conversation)
         return len(similar_cases)
 
+    def clear(self):
+        """Remove all stored cases."""
+        self.conversations.clear()
+        self.projected_conversations.clear()
+        self.version += 1
+        self.save_data()
+
+    def close(self):
+        """Close the embeddings client (app shutdown)."""
+        self.client.close()
+
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store."""
         if not self.conversations:
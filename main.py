@@ -1,6 +1,10 @@
 """SIVA FastAPI server main entry point."""
 
+import asyncio
+import logging
+import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Add src directory to Python path for absolute imports
@@ -10,7 +14,6 @@ if str(src_path) not in sys.path:
 
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
 
 # Import new settings module
 from siva.settings import settings, get_siva_config
@@ -26,10 +29,18 @@ except ImportError:
 
 from core.data_manager import DataManager
 from core.llm_judge import LLMJudge
+from core.processor import create_openai_client
 from core.vector_store import VectorStore
 from api import routes
 from api.embedding_viz import router as embedding_router
-from api.websockets import websocket_tts, websocket_stt
+from api.websockets import (
+    websocket_chat,
+    websocket_tts,
+    websocket_stt,
+    open_tts_pool,
+    close_tts_pool,
+    load_local_stt_model,
+)
 
 # Import the bridge for tau2-bench integration
 from siva.bridge import initialize_bridge
@@ -37,11 +48,34 @@ from siva.bridge import initialize_bridge
 # Import new API service
 from siva.api_service.main_router import main_router as new_api_router
 
+# Server log verbosity for the siva.* loggers; SIVA_LOG=DEBUG traces every turn
+siva_logger = logging.getLogger("siva")
+siva_logger.setLevel(os.getenv("SIVA_LOG", "INFO").upper())
+if not siva_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("[%(name)s] %(levelname)s %(message)s"))
+    siva_logger.addHandler(_handler)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream connections on startup and close them on shutdown."""
+    await open_tts_pool()
+    await asyncio.to_thread(load_local_stt_model)
+    yield
+    await routes.drain_archive_tasks()
+    await close_tts_pool()
+    await openai_client.close()
+    llm_judge.close()
+    vector_store.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="SIVA API",
     description="Self-Learning Voice Agent for Healthcare Intake",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -51,16 +85,22 @@ app.add_middleware(
     allow_credentials=settings.cors_credentials,
     allow_methods=settings.cors_methods,
     allow_headers=settings.cors_headers,
+    max_age=settings.cors_max_age,
 )
 
 # Initialize global components
-openai_client = OpenAI(api_key=settings.openai_api_key)
+openai_client = create_openai_client(settings.openai_api_key)
 vector_store = VectorStore(
     data_dir=settings.data_dir,
     similarity_threshold=settings.similarity_threshold,
     openai_api_key=settings.openai_api_key,
 )
-llm_judge = LLMJudge(openai_api_key=settings.openai_api_key)
+llm_judge = LLMJudge(
+    openai_api_key=settings.openai_api_key,
+    local_model=settings.llm_judge_local_model,
+    local_model_url=settings.llm_judge_local_url,
+    cache_path=str(Path(settings.data_dir) / "llm_judge_cache.sqlite"),
+)
 data_manager = DataManager(data_dir=settings.data_dir)
 
 # Initialize the SIVA bridge for tau2-bench integration
@@ -97,6 +137,12 @@ async def tts_endpoint(websocket: WebSocket):
     await websocket_tts(websocket)
 
 
+@app.websocket("/ws/chat")
+async def chat_endpoint(websocket: WebSocket):
+    """Duplex chat + streaming TTS WebSocket endpoint."""
+    await websocket_chat(websocket)
+
+
 @app.websocket("/ws/stt")
 async def stt_endpoint(websocket: WebSocket):
     """Speech-to-Text WebSocket endpoint."""
@@ -111,4 +157,7 @@ if __name__ == "__main__":
         host=settings.app_host,
         port=settings.app_port,
         reload=settings.app_reload,
+        # The sockets mostly carry PCM audio, which deflate can't shrink; skip
+        # the per-frame zlib pass on both ends
+        ws_per_message_deflate=False,
     )
@@ -1,4 +1,4 @@
 #!/bin/bash
 
 echo "Starting the Siva server..."
-uvicorn src.sive.api_service.simulation_service:app --host 127.0.0.1 --port 8001
\ No newline at end of file
+uvicorn src.siva.api_service.simulation_service:app --host 127.0.0.1 --port 8001
\ No newline at end of file
@@ -36,10 +36,10 @@ class ChatService:
         """
         if use_legacy:
             # Use legacy processor for backward compatibility
-            return self.bridge.process_message_legacy(session_id, message)
+            return await self.bridge.process_message_legacy(session_id, message)
         else:
             # Use new tau2-bench system
-            return self.bridge.process_message_tau2(session_id, message)
+            return await self.bridge.process_message_tau2(session_id, message)
 
     async def process_message_with_agent(
         self, session_id: str, message: str
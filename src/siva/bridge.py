@@ -15,7 +15,7 @@ from core.vector_store import VectorStore
 from core.llm_judge import LLMJudge
 from core.data_manager import DataManager
 from core.processor import UnifiedProcessor
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from .domains.patient_intake.environment import (
     PatientIntakeEnvironment,
@@ -41,7 +41,7 @@ class SIVABridge:
         vector_store: VectorStore,
         llm_judge: LLMJudge,
         data_manager: DataManager,
-        openai_client: OpenAI,
+        openai_client: AsyncOpenAI,
         current_mode: str = "patient_intake",
     ):
         self.vector_store = vector_store
@@ -86,7 +86,7 @@ class SIVABridge:
             current_mode=self.current_mode,
         )
 
-    def process_message_legacy(
+    async def process_message_legacy(
         self, session_id: str, message: str
     ) -> Tuple[str, bool, Dict[str, Any]]:
         """
@@ -100,7 +100,7 @@ class SIVABridge:
         processor = self.create_legacy_processor(session)
 
         # Process the message
-        reply, end_call, escalation_info = processor.next_prompt(message)
+        reply, end_call, escalation_info = await processor.next_prompt(message)
 
         # Update session
         session.update(
@@ -113,7 +113,7 @@ class SIVABridge:
 
         return reply, end_call, escalation_info
 
-    def process_message_tau2(
+    async def process_message_tau2(
         self, session_id: str, message: str
     ) -> Tuple[str, bool, Dict[str, Any]]:
         """
@@ -131,7 +131,9 @@ class SIVABridge:
         )
 
         # Process the message using the environment
-        reply, end_call, escalation_info = self.environment.process_message(message)
+        reply, end_call, escalation_info = await self.environment.process_message(
+            message
+        )
 
         # Update session with new data
         session.update(
@@ -277,7 +279,7 @@ def initialize_bridge(
     vector_store: VectorStore,
     llm_judge: LLMJudge,
     data_manager: DataManager,
-    openai_client: OpenAI,
+    openai_client: AsyncOpenAI,
     current_mode: str = "patient_intake",
 ) -> SIVABridge:
     """
@@ -73,10 +73,23 @@ DATA_DIR = "siva_data"
 # OpenAI Configuration
 OPENAI_MODEL = "gpt-3.5-turbo-1106"
 OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
-OPENAI_WHISPER_MODEL = "whisper-1"
+OPENAI_WHISPER_MODEL = "gpt-4o-mini-transcribe"  # faster than whisper-1 on short clips
 OPENAI_MAX_TOKENS = 300
 OPENAI_TEMPERATURE = 0.3
 
+# LLM Judge Configuration
+LLM_JUDGE_LOCAL_MODEL = None  # e.g. "qwen2.5:1.5b-instruct" served by Ollama
+LLM_JUDGE_LOCAL_URL = "http://localhost:11434"
+
+# Local Speech-to-Text
+STT_LOCAL_MODEL = None  # e.g. "base.en" run in-process by faster-whisper
+STT_LOCAL_COMPUTE_TYPE = "int8"
+
+# Session Storage
+SESSION_MAX_COUNT = 10_000
+SESSION_TTL_SECONDS = 3600
+SESSION_COMPLETED_GRACE_SECONDS = 300  # kept briefly after routing finishes
+
 # Application Mode
 CURRENT_MODE = "patient_intake"
 
@@ -85,3 +98,5 @@ CORS_ORIGINS = ["*"]
 CORS_CREDENTIALS = True
 CORS_METHODS = ["*"]
 CORS_HEADERS = ["*"]
+# Seconds browsers may cache a preflight response (Chromium caps this at 2 hours)
+CORS_MAX_AGE = 86400
@@ -13,7 +13,7 @@ from core.vector_store import VectorStore
 from core.llm_judge import LLMJudge
 from core.data_manager import DataManager
 from core.processor import UnifiedProcessor
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from siva.agent.llm_agent import WorkflowPhase, ValidationStatus, PatientData
 from siva.data_model.message import Message, UserMessage, AssistantMessage, ToolMessage
@@ -62,7 +62,7 @@ class PatientIntakeEnvironment(Environment):
         vector_store: Optional[VectorStore] = None,
         llm_judge: Optional[LLMJudge] = None,
         data_manager: Optional[DataManager] = None,
-        openai_client: Optional[OpenAI] = None,
+        openai_client: Optional[AsyncOpenAI] = None,
         solo_mode: bool = False,
     ):
         super().__init__(domain_name, policy, tools, user_tools)
@@ -305,7 +305,7 @@ class PatientIntakeEnvironment(Environment):
         self.session_data["data"] = self.patient_data.dict()
         self.session_data["last_activity_time"] = datetime.now().isoformat()
 
-    def process_message(self, message: str) -> tuple[str, bool, Dict[str, Any]]:
+    async def process_message(self, message: str) -> tuple[str, bool, Dict[str, Any]]:
         """
         Process a message using the environment.
         This integrates with your existing processor logic.
@@ -322,7 +322,7 @@ class PatientIntakeEnvironment(Environment):
             )
 
             # Process the message
-            reply, end_call, escalation_info = processor.next_prompt(message)
+            reply, end_call, escalation_info = await processor.next_prompt(message)
 
             # Update session data
             self.session_data.update(
@@ -468,7 +468,7 @@ def get_environment(
     vector_store: Optional[VectorStore] = None,
     llm_judge: Optional[LLMJudge] = None,
     data_manager: Optional[DataManager] = None,
-    openai_client: Optional[OpenAI] = None,
+    openai_client: Optional[AsyncOpenAI] = None,
 ) -> PatientIntakeEnvironment:
     """Get the patient intake environment."""
     # Load policy
@@ -512,7 +512,7 @@ def get_environment_manual_policy(
     vector_store: Optional[VectorStore] = None,
     llm_judge: Optional[LLMJudge] = None,
     data_manager: Optional[DataManager] = None,
-    openai_client: Optional[OpenAI] = None,
+    openai_client: Optional[AsyncOpenAI] = None,
 ) -> PatientIntakeEnvironment:
     """Get the patient intake environment with manual policy."""
     return get_environment(
@@ -533,7 +533,7 @@ def get_environment_workflow_policy(
     vector_store: Optional[VectorStore] = None,
     llm_judge: Optional[LLMJudge] = None,
     data_manager: Optional[DataManager] = None,
-    openai_client: Optional[OpenAI] = None,
+    openai_client: Optional[AsyncOpenAI] = None,
 ) -> PatientIntakeEnvironment:
     """Get the patient intake environment with workflow policy."""
     return get_environment(
@@ -73,6 +73,7 @@ class Tool(BaseTool):
         super().__init__(name=name, **self.parse_data(sig, doc, predefined))
         self._use_short_desc = use_short_desc
         self._predefined = predefined
+        self._openai_schema: Optional[dict] = None
         self._func = func
         self.__name__ = name
         self.__signature__ = sig  # type: ignore
@@ -138,15 +139,21 @@ class Tool(BaseTool):
     @override
     @property
     def openai_schema(self) -> dict:
-        """Get the OpenAI schema of the tool."""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self._get_description(),
-                "parameters": self.params.model_json_schema(),
-            },
-        }
+        """Get the OpenAI schema of the tool.
+
+        Built on first use and reused: generate() asks for every tool's schema on
+        each LLM call, and model_json_schema() is costly to recompute.
+        """
+        if self._openai_schema is None:
+            self._openai_schema = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self._get_description(),
+                    "parameters": self.params.model_json_schema(),
+                },
+            }
+        return self._openai_schema
 
     def to_str(self) -> str:
         """Represent the tool as a string."""
@@ -77,6 +77,40 @@ class SivaSettings(BaseSettings):
         description="Temperature for OpenAI responses",
     )
 
+    # LLM Judge Configuration
+    llm_judge_local_model: Optional[str] = Field(
+        default=config.LLM_JUDGE_LOCAL_MODEL,
+        description="Local (Ollama) model for symptom summaries; OpenAI if unset",
+    )
+    llm_judge_local_url: str = Field(
+        default=config.LLM_JUDGE_LOCAL_URL,
+        description="Base URL of the local model server",
+    )
+
+    # Local Speech-to-Text
+    stt_local_model: Optional[str] = Field(
+        default=config.STT_LOCAL_MODEL,
+        description="Local faster-whisper model for speech-to-text; OpenAI if unset",
+    )
+    stt_local_compute_type: str = Field(
+        default=config.STT_LOCAL_COMPUTE_TYPE,
+        description="faster-whisper compute type (e.g. int8, float16)",
+    )
+
+    # Session Storage
+    session_max_count: int = Field(
+        default=config.SESSION_MAX_COUNT,
+        description="Maximum number of in-memory sessions before LRU eviction",
+    )
+    session_ttl_seconds: int = Field(
+        default=config.SESSION_TTL_SECONDS,
+        description="Seconds of inactivity after which a session is dropped",
+    )
+    session_completed_grace_seconds: int = Field(
+        default=config.SESSION_COMPLETED_GRACE_SECONDS,
+        description="Seconds a finished session is kept before it is dropped",
+    )
+
     # Application Mode
     current_mode: str = Field(
         default=config.CURRENT_MODE,
@@ -96,6 +130,10 @@ class SivaSettings(BaseSettings):
     cors_headers: list[str] = Field(
         default=config.CORS_HEADERS, description="Allowed CORS headers"
     )
+    cors_max_age: int = Field(
+        default=config.CORS_MAX_AGE,
+        description="Seconds browsers may cache CORS preflight responses",
+    )
 
     # Tau2-bench Configuration
     max_steps: int = Field(
@@ -189,9 +227,17 @@ def get_siva_config() -> dict:
         "openai_whisper_model": settings.openai_whisper_model,
         "openai_max_tokens": settings.openai_max_tokens,
         "openai_temperature": settings.openai_temperature,
+        "llm_judge_local_model": settings.llm_judge_local_model,
+        "llm_judge_local_url": settings.llm_judge_local_url,
+        "stt_local_model": settings.stt_local_model,
+        "stt_local_compute_type": settings.stt_local_compute_type,
+        "session_max_count": settings.session_max_count,
+        "session_ttl_seconds": settings.session_ttl_seconds,
+        "session_completed_grace_seconds": settings.session_completed_grace_seconds,
         "current_mode": settings.current_mode,
         "cors_origins": settings.cors_origins,
         "cors_credentials": settings.cors_credentials,
         "cors_methods": settings.cors_methods,
         "cors_headers": settings.cors_headers,
+        "cors_max_age": settings.cors_max_age,
     }
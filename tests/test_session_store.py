@@ -0,0 +1,125 @@
+"""
+Tests for the bounded in-memory session store in core/session_store.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add the repository root to Python path so the core package imports
+root_path = Path(__file__).parent.parent
+if str(root_path) not in sys.path:
+    sys.path.insert(0, str(root_path))
+
+import pytest
+
+from core import session_store
+from core.session_store import SessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable stand-in for time.monotonic."""
+
+    class Clock:
+        now = 1000.0
+
+        def advance(self, seconds: float):
+            self.now += seconds
+
+    fake = Clock()
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: fake.now)
+    return fake
+
+
+class TestSessionStore:
+    """Test TTL expiry, LRU eviction, finish() grace and pinning."""
+
+    def test_idle_sessions_expire_oldest_first(self, clock):
+        """Test that sessions expire in order of their last activity."""
+        store = SessionStore(maxsize=10, ttl=60)
+        store["a"] = {"n": 1}
+        clock.advance(30)
+        store["b"] = {"n": 2}
+        clock.advance(20)
+        store["a"]  # refreshes a, so b is now the oldest
+
+        clock.advance(45)
+        assert "b" not in store
+        assert store["a"] == {"n": 1}
+
+        clock.advance(61)
+        assert len(store) == 0
+
+    def test_bulk_reads_do_not_refresh_ttl(self, clock):
+        """Test that values/items/iteration don't count as activity."""
+        store = SessionStore(maxsize=10, ttl=60)
+        store["a"] = {}
+        clock.advance(50)
+        assert list(store) == ["a"]
+        assert store.values() == [{}]
+        assert store.items() == [("a", {})]
+
+        clock.advance(11)
+        assert len(store) == 0
+
+    def test_finish_evicts_after_grace_despite_activity(self, clock):
+        """Test that a finished session goes after its grace period."""
+        store = SessionStore(maxsize=10, ttl=60)
+        store["a"] = {}
+        store.finish("a", grace=10)
+        clock.advance(9)
+        assert "a" in store
+
+        clock.advance(2)
+        assert "a" not in store
+
+    def test_writing_a_finished_session_cancels_finish(self, clock):
+        """Test that a new write keeps a finished session alive."""
+        store = SessionStore(maxsize=10, ttl=60)
+        store["a"] = {}
+        store.finish("a", grace=10)
+        store["a"] = {"restarted": True}
+
+        clock.advance(30)
+        assert store["a"] == {"restarted": True}
+
+    def test_maxsize_evicts_least_recently_used(self, clock):
+        """Test that the least recently used session is dropped when full."""
+        store = SessionStore(maxsize=2, ttl=60)
+        store["a"] = {}
+        store["b"] = {}
+        store["a"]  # b becomes least recently used
+        store["c"] = {}
+
+        assert sorted(store) == ["a", "c"]
+
+    def test_pinned_session_survives_ttl_and_eviction(self, clock):
+        """Test that a pinned session stays until it is finished."""
+        store = SessionStore(maxsize=1, ttl=60)
+        store["escalated"] = {"pending": True}
+        store.pin("escalated")
+        store["other"] = {}
+        store["newest"] = {}
+
+        clock.advance(7200)
+        assert store["escalated"] == {"pending": True}
+        assert list(store) == ["escalated"]
+
+        store.finish("escalated", grace=10)
+        clock.advance(5)
+        assert "escalated" in store
+        clock.advance(6)
+        assert "escalated" not in store
+
+    def test_clear_and_delete_include_pinned(self, clock):
+        """Test that pinned sessions can still be removed explicitly."""
+        store = SessionStore(maxsize=10, ttl=60)
+        store["a"] = {}
+        store["b"] = {}
+        store.pin("a")
+        del store["a"]
+        assert list(store) == ["b"]
+
+        store.pin("b")
+        store.clear()
+        assert len(store) == 0
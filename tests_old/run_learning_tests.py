@@ -114,6 +114,12 @@ async def main():
     parser.add_argument(
         "--save-results", action="store_true", help="Save test results to file"
     )
+    parser.add_argument(
+        "--pace",
+        type=float,
+        default=0.0,
+        help="Seconds to pause between scenarios and rounds (default: no pause)",
+    )
 
     args = parser.parse_args()
 
@@ -136,7 +142,7 @@ async def main():
         elif args.test_type == "quick":
             print("\n🚀 Running Quick Learning Test")
             print("   2 rounds, 3 scenarios per round")
-            result = await run_quick_learning_test(args.url)
+            result = await run_quick_learning_test(args.url, pace=args.pace)
 
             print(f"\n📈 Quick Test Summary:")
             print(f"   Rounds completed: {len(result['round_results'])}")
@@ -152,7 +158,7 @@ async def main():
         elif args.test_type == "comprehensive":
             print("\n🎯 Running Comprehensive Learning Test")
             print("   5 rounds, 8 scenarios per round")
-            result = await run_comprehensive_learning_test(args.url)
+            result = await run_comprehensive_learning_test(args.url, pace=args.pace)
 
             print(f"\n📈 Comprehensive Test Summary:")
             print(f"   Rounds completed: {len(result['round_results'])}")
@@ -9,6 +9,8 @@ import time
 import uuid
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime, timedelta
+import numpy as np
+import orjson
 import requests
 import logging
 from dataclasses import dataclass, asdict
@@ -24,6 +26,12 @@ from .patient_scenarios import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Completed calls are archived (and feedback adds cases) in the background on the
+# server, so a cached stats payload is only reused for this many seconds
+STATS_CACHE_TTL = 2.0
+
 
 @dataclass
 class TestResult:
@@ -60,11 +68,18 @@ class LearningMetrics:
 class SIVALearningTester:
     """Main testing framework for SIVA learning system."""
 
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", pace: float = 0.0):
         self.base_url = base_url
+        # Optional pause (seconds) between scenarios/rounds for human-readable logs
+        self.pace = pace
         self.test_results: List[TestResult] = []
         self.learning_metrics: List[LearningMetrics] = []
         self.session = requests.Session()
+        # Bumped whenever a conversation completes; stats payloads are reused
+        # until then, and for at most STATS_CACHE_TTL seconds since the server
+        # stores keep growing after the final reply
+        self._stats_version = 0
+        self._stats_cache: Dict[str, Tuple[int, float, Dict[str, Any]]] = {}
 
     def create_session_id(self) -> str:
         """Generate unique session ID for testing."""
@@ -72,14 +87,21 @@ class SIVALearningTester:
 
     async def send_chat_message(self, session_id: str, message: str) -> Dict[str, Any]:
         """Send a chat message to SIVA system."""
+        return await self._post_chat(
+            orjson.dumps({"session_id": session_id, "message": message})
+        )
+
+    async def _post_chat(self, body: bytes) -> Dict[str, Any]:
+        """Post a pre-serialized chat request body to SIVA system."""
         try:
             response = self.session.post(
                 f"{self.base_url}/chat",
-                json={"session_id": session_id, "message": message},
+                data=body,
+                headers=JSON_HEADERS,
                 timeout=30,
             )
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             return {}
@@ -94,12 +116,19 @@ class SIVALearningTester:
         if verbose:
             print(f"\n🔄 Testing: {scenario.name} (Expected: {scenario.route.value})")
 
+        # The session id is fixed for the whole scenario, so serialize every
+        # request body up front instead of once per POST
+        bodies = [
+            orjson.dumps({"session_id": session_id, "message": message})
+            for message in scenario.conversation_flow
+        ]
+
         responses = []
-        for i, message in enumerate(scenario.conversation_flow):
+        for message, body in zip(scenario.conversation_flow, bodies):
             if verbose:
                 print(f"  👤 User: {message}")
 
-            response = await self.send_chat_message(session_id, message)
+            response = await self._post_chat(body)
 
             if response:
                 if verbose:
@@ -112,11 +141,9 @@ class SIVALearningTester:
 
                 # Check if conversation ended
                 if response.get("end_call", False):
+                    self._stats_version += 1
                     break
 
-            # Small delay between messages
-            await asyncio.sleep(0.2)
-
         processing_time = time.time() - start_time
 
         if not responses:
@@ -158,13 +185,27 @@ class SIVALearningTester:
 
         return result
 
+    def _get_stats(self, path: str) -> Dict[str, Any]:
+        """Fetch a stats endpoint, reusing the cached payload if nothing changed."""
+        now = time.monotonic()
+        cached = self._stats_cache.get(path)
+        if (
+            cached
+            and cached[0] == self._stats_version
+            and now - cached[1] < STATS_CACHE_TTL
+        ):
+            return cached[2]
+
+        response = self.session.get(f"{self.base_url}{path}")
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        self._stats_cache[path] = (self._stats_version, now, data)
+        return data
+
     async def get_similar_cases_count(self, session_id: str) -> int:
         """Get count of similar cases for current conversation."""
         try:
-            response = self.session.get(f"{self.base_url}/vector_store/stats")
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("total_conversations", 0)
+            return self._get_stats("/vector_store/stats").get("total_conversations", 0)
         except:
             pass
         return 0
@@ -172,13 +213,8 @@ class SIVALearningTester:
     async def get_current_metrics(self) -> LearningMetrics:
         """Get current system metrics."""
         try:
-            # Fetch dashboard metrics
-            dashboard_response = self.session.get(f"{self.base_url}/dashboard/metrics")
-            dashboard_data = dashboard_response.json()
-
-            # Fetch vector store stats
-            vector_response = self.session.get(f"{self.base_url}/vector_store/stats")
-            vector_data = vector_response.json()
+            # Only counts are needed here, so skip the full dashboard payload
+            summary_data = self._get_stats("/dashboard/metrics/summary")
 
             # Calculate metrics from test results
             recent_results = [
@@ -225,7 +261,7 @@ class SIVALearningTester:
                 processing_efficiency = 0.0
 
             # System readiness score (composite metric)
-            vector_size = vector_data.get("total_conversations", 0)
+            vector_size = summary_data.get("vector_store_size", 0)
             readiness_score = min(
                 100,
                 (
@@ -239,7 +275,7 @@ class SIVALearningTester:
 
             return LearningMetrics(
                 timestamp=datetime.now().isoformat(),
-                total_conversations=dashboard_data.get("total_conversations", 0),
+                total_conversations=summary_data.get("total_conversations", 0),
                 vector_store_size=vector_size,
                 accuracy_rate=accuracy_rate,
                 escalation_rate=escalation_rate,
@@ -301,8 +337,8 @@ class SIVALearningTester:
                     self.test_results.append(result)
                     round_results.append(result)
 
-                # Brief pause between scenarios
-                await asyncio.sleep(1)
+                if self.pace:
+                    await asyncio.sleep(self.pace)
 
             # Get final metrics for this round
             final_metrics = await self.get_current_metrics()
@@ -335,10 +371,9 @@ class SIVALearningTester:
                 f"   System Readiness: {final_metrics.system_readiness_score:.1f}/100"
             )
 
-            # Pause between rounds to allow system to process
-            if round_num < rounds:
+            if self.pace and round_num < rounds:
                 print(f"\n⏳ Waiting before next round...")
-                await asyncio.sleep(3)
+                await asyncio.sleep(self.pace)
 
         test_summary["end_time"] = datetime.now().isoformat()
         return test_summary
@@ -416,27 +451,32 @@ class SIVALearningTester:
         if not self.test_results:
             return {"error": "No test results available"}
 
+        # Collect per-scenario columns once and reduce them vectorized
+        expected = np.array([r.expected_route for r in self.test_results])
+        correct = np.array([r.correct for r in self.test_results], dtype=bool)
+        confidence = np.array([r.confidence for r in self.test_results], dtype=float)
+        processing_time = np.array(
+            [r.processing_time for r in self.test_results], dtype=float
+        )
+
         # Overall statistics
         total_tests = len(self.test_results)
-        correct_predictions = sum(1 for r in self.test_results if r.correct)
+        correct_predictions = int(correct.sum())
         overall_accuracy = correct_predictions / total_tests
 
         # Route-specific analysis
         route_analysis = {}
         for route in RouteType:
-            route_results = [
-                r for r in self.test_results if r.expected_route == route.value
-            ]
-            if route_results:
+            mask = expected == route.value
+            route_total = int(mask.sum())
+            if route_total:
+                route_correct = int(correct[mask].sum())
                 route_analysis[route.value] = {
-                    "total": len(route_results),
-                    "correct": sum(1 for r in route_results if r.correct),
-                    "accuracy": sum(1 for r in route_results if r.correct)
-                    / len(route_results),
-                    "avg_confidence": sum(r.confidence for r in route_results)
-                    / len(route_results),
-                    "avg_processing_time": sum(r.processing_time for r in route_results)
-                    / len(route_results),
+                    "total": route_total,
+                    "correct": route_correct,
+                    "accuracy": route_correct / route_total,
+                    "avg_confidence": float(confidence[mask].mean()),
+                    "avg_processing_time": float(processing_time[mask].mean()),
                 }
 
         # Learning progression analysis
@@ -461,10 +501,8 @@ class SIVALearningTester:
                 "total_tests": total_tests,
                 "correct_predictions": correct_predictions,
                 "overall_accuracy": overall_accuracy,
-                "avg_confidence": sum(r.confidence for r in self.test_results)
-                / total_tests,
-                "avg_processing_time": sum(r.processing_time for r in self.test_results)
-                / total_tests,
+                "avg_confidence": float(confidence.mean()),
+                "avg_processing_time": float(processing_time.mean()),
             },
             "route_analysis": route_analysis,
             "learning_progression": learning_progression,
@@ -500,20 +538,20 @@ class SIVALearningTester:
 
 # Convenience functions for running tests
 async def run_quick_learning_test(
-    base_url: str = "http://localhost:8000",
+    base_url: str = "http://localhost:8000", pace: float = 0.0
 ) -> Dict[str, Any]:
     """Run a quick learning test with minimal scenarios."""
-    tester = SIVALearningTester(base_url)
+    tester = SIVALearningTester(base_url, pace=pace)
     return await tester.run_learning_progression_test(
         rounds=2, scenarios_per_round=3, verbose=True
     )
 
 
 async def run_comprehensive_learning_test(
-    base_url: str = "http://localhost:8000",
+    base_url: str = "http://localhost:8000", pace: float = 0.0
 ) -> Dict[str, Any]:
     """Run a comprehensive learning test with full scenario coverage."""
-    tester = SIVALearningTester(base_url)
+    tester = SIVALearningTester(base_url, pace=pace)
     return await tester.run_learning_progression_test(
         rounds=5, scenarios_per_round=8, verbose=True
     )